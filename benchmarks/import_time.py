@@ -0,0 +1,64 @@
+"""导入耗时基准：用 python -X importtime 测量各入口模块的导入时间
+
+用法（在项目根目录）：
+    python -m benchmarks.import_time                    # 默认入口模块，各测5次取中位数
+    python -m benchmarks.import_time --runs 10 --top 8 src.core.processor
+
+同时检查导入后是否提前加载了重量级依赖（openai、PyPDF2等），这些依赖应在首次使用时才导入。
+"""
+import sys
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_MODULES = ["src.handlers.text_processor", "src.handlers.latex_handler", "src.core.processor", "main"]
+HEAVY_DEPENDENCIES = ["openai", "httpx", "pydantic", "PyPDF2", "tenacity", "dotenv", "tiktoken"]
+
+def measure(module: str):
+    """在新的解释器中导入模块，返回(总耗时微秒, {模块名: 累计耗时微秒}, 已加载的重量级依赖)"""
+    code = (f"import sys, {module}; "
+            f"print(','.join(m for m in {HEAVY_DEPENDENCIES!r} if m in sys.modules))")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if cumulative_us.strip().isdigit():
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            entries.append((depth, name.strip(), int(cumulative_us)))
+    # -X importtime 按完成顺序输出，模块的依赖位于其自身记录之前且缩进更深
+    total, cumulative = 0, {}
+    for i, (depth, name, us) in enumerate(entries):
+        if depth == 0 and name == module:
+            total = us
+            j = i - 1
+            while j >= 0 and entries[j][0] > 0:
+                cumulative[entries[j][1]] = entries[j][2]
+                j -= 1
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return total, cumulative, loaded
+
+def main():
+    parser = argparse.ArgumentParser(description="入口模块导入耗时基准")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="要测量的模块")
+    parser.add_argument("--runs", type=int, default=5, help="每个模块的测量次数")
+    parser.add_argument("--top", type=int, default=5, help="列出耗时最多的依赖数量")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        totals = []
+        for _ in range(max(1, args.runs)):
+            total, cumulative, loaded = measure(module)
+            totals.append(total)
+        print(f"{module}: {statistics.median(totals) / 1000:.1f} ms（中位数，{len(totals)} 次）")
+        heaviest = sorted(((us, name) for name, us in cumulative.items()), reverse=True)
+        for us, name in heaviest[:args.top]:
+            print(f"    {us / 1000:>8.1f} ms  {name}")
+        print(f"    已加载的重量级依赖：{', '.join(loaded) or '无'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+class MockOpenAIServer:
+    """本地模拟的 OpenAI chat-completions 接口，用于离线基准测试
+
+    Args:
+        latency: 每次请求的基础延迟（秒）
+        jitter: 延迟的随机波动幅度（秒）
+        failure_rate: 返回错误的请求比例（0~1）
+        failure_status: 失败时返回的HTTP状态码（如429、500）
+        response_chars: 每次回复的字符数
+        seed: 随机种子，便于复现
+    """
+
+    def __init__(self, latency: float = 1.0, jitter: float = 0.2, failure_rate: float = 0.0,
+                 failure_status: int = 500, response_chars: int = 3000, seed: Optional[int] = 0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.response_chars = response_chars
+        self.requests = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _next_request(self):
+        """返回(本次延迟, 是否失败)"""
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            failed = self._random.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+            return delay, failed
+
+    def _content(self, prompt: str) -> str:
+        filler = "这是模拟的解读内容，包含公式$O(N^2)$与说明。"
+        body = (filler * (self.response_chars // len(filler) + 1))[:self.response_chars]
+        return f"\\section*{{模拟章节 {len(prompt)}}}\n{body}\n"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+
+                delay, failed = server._next_request()
+                time.sleep(delay)
+                if failed:
+                    headers = {"Retry-After": "1"} if server.failure_status == 429 else {}
+                    self._send_json(server.failure_status,
+                                    {"error": {"message": "mock failure", "type": "server_error"}}, headers)
+                    return
+
+                prompt = "".join(m.get("content", "") for m in payload.get("messages", []))
+                content = server._content(prompt)
+                usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 2}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                model = payload.get("model", "mock")
+                if payload.get("stream"):
+                    self._send_stream(model, content, usage)
+                else:
+                    self._send_json(200, {
+                        "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                     "finish_reason": "stop"}],
+                        "usage": usage,
+                    })
+
+            def _send_json(self, status, body, headers=None):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, model, content, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                base = {"id": "chatcmpl-mock", "object": "chat.completion.chunk",
+                        "created": int(time.time()), "model": model}
+                pieces = [content[i:i + 200] for i in range(0, len(content), 200)]
+                for piece in pieces:
+                    event = dict(base, choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+                    self._write_event(event)
+                self._write_event(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+                self._write_event(dict(base, choices=[], usage=usage))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+            def _write_event(self, event):
+                self.wfile.write(b"data: " + json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n\n")
+
+        return Handler
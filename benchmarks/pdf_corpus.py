@@ -0,0 +1,60 @@
+from pathlib import Path
+from typing import List
+
+_WORDS = ("attention", "model", "sequence", "memory", "segment", "recurrence", "position",
+          "encoding", "layer", "training", "context", "dependency", "language", "state")
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path: Path, pages: List[List[str]]) -> None:
+    """写出仅包含文本的最小PDF（Helvetica字体，每页若干行）"""
+    objects = {
+        1: "<< /Type /Catalog /Pages 2 0 R >>",
+        2: "<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages))), len(pages)),
+        3: "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    for i, lines in enumerate(pages):
+        stream = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_escape(line)}) '" for line in lines) + " ET"
+        objects[4 + 2 * i] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                              f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>")
+        objects[5 + 2 * i] = f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream"
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(data)
+        data += f"{number} 0 obj\n{objects[number]}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for number in sorted(objects):
+        data += f"{offsets[number]:010d} 00000 n \n".encode()
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    Path(path).write_bytes(bytes(data))
+
+def make_paper(path: Path, num_pages: int, salt: str = "", lines_per_page: int = 60) -> Path:
+    """生成一篇结构类似论文的PDF：页眉、摘要、编号章节与小节、公式行、页码、致谢与参考文献"""
+    pages = []
+    section = 0
+    for p in range(num_pages):
+        lines = [f"Preprint {salt}. Under review."]
+        if p == 0:
+            lines += [f"Synthetic Paper {salt}", "Abstract", "We study long-range dependency in language models."]
+        for j in range(lines_per_page - len(lines) - 1):
+            if j % 20 == 0:
+                major, minor = divmod(section, 3)
+                section += 1
+                lines.append(f"{major + 1}.{minor} Synthetic Section {section}" if minor else f"{major + 1} Synthetic Topic {section}")
+                continue
+            words = " ".join(_WORDS[(p * 7 + j * 3 + k) % len(_WORDS)] for k in range(12))
+            if j % 9 == 0:
+                words += f" h_t = softmax(QK^T / sqrt(d)) V + {p}{j}"
+            lines.append(f"{words.capitalize()} {salt}.")
+        lines.append(str(p + 1))
+        pages.append(lines)
+    tail = ["Acknowledgements", "We thank the anonymous reviewers for their comments.", "References"]
+    tail += [f"[{i}] A. Author and B. Author. A synthetic reference {i}. 20{10 + i}." for i in range(1, 7)]
+    pages[-1][-1:-1] = tail
+    write_pdf(path, pages)
+    return path
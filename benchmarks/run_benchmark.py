@@ -0,0 +1,134 @@
+"""离线基准测试：用本地模拟的 OpenAI 接口对生成的PDF语料运行完整处理流程
+
+用法（在项目根目录）：
+    python -m benchmarks.run_benchmark                       # 默认语料与接口参数
+    python -m benchmarks.run_benchmark --pages 5 20 60 --latency 2 --failure-rate 0.05
+    python -m benchmarks.run_benchmark --baseline benchmarks/results/20250101_120000.json
+
+每篇PDF在独立子进程中处理，以便分别统计峰值内存；结果保存到 benchmarks/results/。
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import resource
+import subprocess
+import tempfile
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+def run_case(pdf_path: str) -> dict:
+    """在当前进程中处理一篇PDF并返回指标（由子进程调用）"""
+    from src.core.processor import PaperProcessor
+
+    stats = {}
+    start = time.time()
+    status = "ok"
+    try:
+        _, compiled_path, _ = PaperProcessor().process_pdf(pdf_path, stats)
+        if not compiled_path:
+            status = "ok (no pdf)"
+    except Exception as e:
+        status = f"error: {e}"
+    elapsed = time.time() - start
+    peak_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    chunks = stats.get("chunks", 0)
+    return {
+        "status": status,
+        "seconds": round(elapsed, 3),
+        "stages": stats.get("stages", {}),
+        "chunks": chunks,
+        "chunks_per_second": round(chunks / elapsed, 3) if elapsed else None,
+        "prompt_tokens": stats.get("prompt_tokens", 0),
+        "completion_tokens": stats.get("completion_tokens", 0),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+    }
+
+def run_benchmark(args) -> dict:
+    from benchmarks.mock_openai_server import MockOpenAIServer
+    from benchmarks.pdf_corpus import make_paper
+
+    run_id = uuid.uuid4().hex[:6]
+    server = MockOpenAIServer(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+                              failure_status=args.failure_status, response_chars=args.response_chars)
+
+    cases = []
+    # 语料、输出、日志与缓存都放在本次运行的临时目录中，运行结束后删除，不在项目目录中留下文件
+    with tempfile.TemporaryDirectory(prefix="texpap_bench_") as work_dir, server:
+        corpus_dir = Path(work_dir) / "papers"
+        corpus_dir.mkdir()
+        env = dict(os.environ, OPENAI_API_KEY="mock", OPENAI_BASE_URL=server.base_url, LLM_CACHE_ENABLED="0",
+                   TEXPAP_OUTPUT_DIR=str(Path(work_dir) / "output"), TEXPAP_LOGS_DIR=str(Path(work_dir) / "logs"),
+                   TEXPAP_CACHE_DIR=str(Path(work_dir) / "cache"))
+        for pages in args.pages:
+            # 每次运行使用不同的内容，避免命中逐页缓存与任务检查点
+            pdf_path = make_paper(corpus_dir / f"b{pages:03d}_{run_id}.pdf", pages, salt=run_id)
+            requests_before = server.requests
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.run_benchmark", "--case", str(pdf_path)],
+                cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+            )
+            try:
+                case = json.loads(output.stdout.strip().splitlines()[-1])
+            except (IndexError, ValueError):
+                case = {"status": f"error: {output.stderr.strip()[-200:]}"}
+            case.update(pages=pages, api_requests=server.requests - requests_before)
+            cases.append(case)
+            print(f"{pages:>4} 页  {case.get('seconds', 0):>8.2f}s  {case.get('chunks', 0):>3} 块  "
+                  f"{case.get('peak_rss_mb', 0):>7.1f} MB  {case['status']}", flush=True)
+
+    return {
+        "run_id": run_id,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("case", "baseline")},
+        "cases": cases,
+    }
+
+def compare(result: dict, baseline: dict) -> None:
+    """按页数对比本次结果与基线"""
+    base_cases = {case["pages"]: case for case in baseline.get("cases", [])}
+    print(f"\n与基线 {baseline.get('timestamp', '')} 对比：")
+    for case in result["cases"]:
+        base = base_cases.get(case["pages"])
+        if not base or "seconds" not in base or "seconds" not in case:
+            continue
+        delta = (case["seconds"] - base["seconds"]) / base["seconds"] * 100 if base["seconds"] else 0
+        print(f"{case['pages']:>4} 页  {base['seconds']:>8.2f}s -> {case['seconds']:>8.2f}s  ({delta:+.1f}%)  "
+              f"峰值内存 {base.get('peak_rss_mb', 0)} -> {case.get('peak_rss_mb', 0)} MB")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Texpap 离线基准测试")
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 15, 30, 60], help="语料中各PDF的页数")
+    parser.add_argument("--latency", type=float, default=1.0, help="模拟接口的平均延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.2, help="延迟的随机波动（秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="模拟接口返回错误的比例")
+    parser.add_argument("--failure-status", type=int, default=500, help="失败时返回的HTTP状态码")
+    parser.add_argument("--response-chars", type=int, default=3000, help="每次回复的字符数")
+    parser.add_argument("--baseline", help="用于对比的历史结果文件")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.case:
+        print(json.dumps(run_case(args.case), ensure_ascii=False))
+        return
+
+    result = run_benchmark(args)
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    result_path = RESULTS_DIR / f"{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存：{result_path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            compare(result, json.load(f))
+
+if __name__ == "__main__":
+    main()
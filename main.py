@@ -1,20 +1,69 @@
-from src.core.processor import PaperProcessor
-from src.config.settings import PAPERS_DIR
+import argparse
+from src.config.settings import PAPERS_DIR, MAX_CONCURRENT_PAPERS, SERVICE_HOST, SERVICE_PORT, ensure_directories
+from src.core.batch import BatchRunner, collect_pdfs
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Texpap 论文解读工具")
+    parser.add_argument("targets", nargs="*", default=[str(PAPERS_DIR)],
+                        help="PDF文件、目录或通配符（如 'Papers/*.pdf'），默认处理 Papers 目录下全部PDF")
+    parser.add_argument("--force", action="store_true", help="即使输出已是最新也重新处理")
+    parser.add_argument("--papers", type=int, default=MAX_CONCURRENT_PAPERS, help="同时处理的论文数量")
+    parser.add_argument("--serve", action="store_true", help="以常驻服务模式运行，通过HTTP接口提交论文")
+    parser.add_argument("--host", default=SERVICE_HOST, help="服务模式监听地址")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT, help="服务模式监听端口")
+    return parser.parse_args()
+
+def serve(args):
+    from src.core.service import PaperService, make_server
+
+    try:
+        service = PaperService(workers=args.papers).start()
+    except Exception as e:
+        print(f"服务启动失败：{str(e)}")
+        return
+    httpd = make_server(service, args.host, args.port)
+    print(f"服务已启动：http://{args.host}:{httpd.server_address[1]}（Ctrl+C 停止）")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        print("正在等待处理中的论文完成...")
+        service.stop()
 
 def main():
+    args = parse_args()
+    ensure_directories()
+    if args.serve:
+        serve(args)
+        return
+
+    pdf_paths = collect_pdfs(args.targets)
+    if not pdf_paths:
+        print(f"未找到PDF文件：{' '.join(args.targets)}")
+        return
+
     try:
-        processor = PaperProcessor()
-        pdf_path = PAPERS_DIR / "Transformer-xl_测试.pdf"
-        tex_path, pdf_path, md_path = processor.process_pdf(str(pdf_path))
-        print(f"处理完成，结果保存在：")
+        runner = BatchRunner(max_concurrent_papers=args.papers)
+    except Exception as e:
+        print(f"处理失败：{str(e)}")
+        return
+
+    results = runner.run(pdf_paths, force=args.force)
+    for result in results:
+        if not result["outputs"]:
+            continue
+        tex_path, pdf_path, md_path = result["outputs"]
+        print(f"{result['paper']} 处理完成，结果保存在：")
         print(f"TEX文件：{tex_path}")
         if pdf_path:
             print(f"PDF文件：{pdf_path}")
         else:
             print("PDF编译失败，但其他文件已正常生成")
         print(f"Markdown文件：{md_path}")
-    except Exception as e:
-        print(f"处理失败：{str(e)}")
+    print()
+    print(BatchRunner.format_summary(results))
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -1,27 +1,86 @@
 import os
 from pathlib import Path
-from dotenv import load_dotenv
-
-# 加载环境变量
-load_dotenv()
 
 # 基础路径配置
 PROJECT_ROOT = Path(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-OUTPUT_DIR = PROJECT_ROOT / "output"
-LOGS_DIR = PROJECT_ROOT / "logs"
+
+def _load_dotenv() -> None:
+    """从本文件所在目录向上查找 .env 并加载（与 load_dotenv() 的查找方式一致），没有 .env 时不导入 python-dotenv"""
+    for directory in Path(__file__).resolve().parents:
+        env_file = directory / ".env"
+        if env_file.is_file():
+            from dotenv import load_dotenv
+            load_dotenv(env_file)
+            return
+
+# 加载环境变量
+_load_dotenv()
+OUTPUT_DIR = Path(os.getenv("TEXPAP_OUTPUT_DIR", PROJECT_ROOT / "output"))  # 输出目录（含任务检查点与上传文件）
+LOGS_DIR = Path(os.getenv("TEXPAP_LOGS_DIR", PROJECT_ROOT / "logs"))  # 日志与运行报告目录
 PAPERS_DIR = PROJECT_ROOT / "Papers"
+CACHE_DIR = Path(os.getenv("TEXPAP_CACHE_DIR", PROJECT_ROOT / "cache"))  # 模型响应、逐页提取与LaTeX格式文件缓存目录
+JOBS_DIR = OUTPUT_DIR / "jobs"  # 各论文任务的检查点目录
+UPLOADS_DIR = OUTPUT_DIR / "uploads"  # 服务模式下上传的PDF
 
 # OpenAI配置
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
 DEFAULT_MODEL = "gpt-4o-mini"
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "1") == "1"  # 是否使用流式接口接收解读结果
+
+# 各模型的token预算：上下文窗口、单次最大输出长度、单个文本块的输入上限
+MODEL_TOKEN_BUDGETS = {
+    "gpt-4o-mini": {"context_window": 128000, "max_output_tokens": 16384, "max_input_tokens": 4000},
+    "gpt-4o": {"context_window": 128000, "max_output_tokens": 16384, "max_input_tokens": 4000},
+    "gpt-3.5-turbo": {"context_window": 16385, "max_output_tokens": 4096, "max_input_tokens": 2500},
+}
+DEFAULT_TOKEN_BUDGET = {"context_window": 8192, "max_output_tokens": 4096, "max_input_tokens": 2000}
+EXPECTED_OUTPUT_RATIO = 1.5  # 解读长度约为原文token数的倍数，用于为输出预留空间
 
 # PDF处理配置
-MAX_CHUNKS = 25
-MIN_CHUNK_SIZE = 1500
+MAX_CHUNKS = 25  # 超过该块数的文档进入长文档模式
+LONG_DOCUMENT_MODE = os.getenv("LONG_DOCUMENT_MODE", "1") == "1"  # 长文档是否分层汇总（章节概要与全文概要），关闭时超过MAX_CHUNKS直接拒绝
+LONG_DOCUMENT_MAX_CHUNKS = int(os.getenv("LONG_DOCUMENT_MAX_CHUNKS", "400"))  # 长文档模式下的文本块上限
+MIN_CHUNK_TOKENS = 400  # 低于该token数的文本块会与相邻块合并
 DEFAULT_CHUNK_SIZE = 7000
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))  # PDF文本提取进程数，设为1即单进程提取
+PDF_PAGES_PER_TASK = 8  # 每个提取任务负责的页数
+SECTION_LLM_FALLBACK = os.getenv("SECTION_LLM_FALLBACK", "0") == "1"  # 超长章节是否调用模型确定切分边界，默认使用本地规则
+PRUNE_APPENDIX = os.getenv("PRUNE_APPENDIX", "1") == "1"  # 是否跳过附录（开启时遇到参考文献即停止提取后续页面）
+PRUNE_ACKNOWLEDGEMENTS = os.getenv("PRUNE_ACKNOWLEDGEMENTS", "1") == "1"  # 是否跳过致谢
+
+# 并发配置
+MAX_CONCURRENT_CHUNKS = int(os.getenv("MAX_CONCURRENT_CHUNKS", "4"))  # 同时解读的文本块数量上限，设为1即串行处理
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "8"))  # 所有论文共享的模型请求并发上限
+REQUESTS_PER_MINUTE = int(os.getenv("REQUESTS_PER_MINUTE", "0"))  # 所有论文共享的每分钟请求数上限，0表示不限
+TOKENS_PER_MINUTE = int(os.getenv("TOKENS_PER_MINUTE", "0"))  # 所有论文共享的每分钟token数上限，0表示不限
+MAX_RETRY_ATTEMPTS = int(os.getenv("MAX_RETRY_ATTEMPTS", "3"))  # 单个请求的最大尝试次数
+CIRCUIT_BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "5"))  # 连续失败多少次后熔断，0表示不熔断
+CIRCUIT_BREAKER_COOLDOWN = float(os.getenv("CIRCUIT_BREAKER_COOLDOWN", "30"))  # 熔断持续时间（秒）
+MAX_CONCURRENT_PAPERS = int(os.getenv("MAX_CONCURRENT_PAPERS", "2"))  # 批量模式下同时处理的论文数量
+
+# 日志配置
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # 日志文件级别，DEBUG可查看每次模型调用，TRACE额外输出文本片段
+CONSOLE_LOG_LEVEL = os.getenv("CONSOLE_LOG_LEVEL", "INFO")  # 控制台日志级别，批量处理时可设为WARNING
+
+# 服务模式配置
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8000"))
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "100"))  # 单个上传PDF的大小上限
+
+# 模型响应缓存配置
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"  # 设为0可绕过缓存，强制重新请求
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_MAX_AGE_DAYS = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30"))
+NEAR_DUPLICATE_ENABLED = os.getenv("NEAR_DUPLICATE_ENABLED", "1") == "1"  # 是否跨论文复用近似重复文本块的解读（LLM_CACHE_ENABLED=0 时同样关闭）
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.9"))  # 估计的Jaccard相似度不低于该值视为近似重复
+NEAR_DUPLICATE_MAX_ENTRIES = int(os.getenv("NEAR_DUPLICATE_MAX_ENTRIES", "20000"))
 
 # LaTeX配置
+LATEX_COMPILE_TIMEOUT = int(os.getenv("LATEX_COMPILE_TIMEOUT", "300"))  # 单次xelatex运行的超时时间（秒）
+MAX_CONCURRENT_COMPILES = int(os.getenv("MAX_CONCURRENT_COMPILES", "2"))  # 批量模式下同时运行的编译数量
+LATEX_PRECOMPILE_PREAMBLE = os.getenv("LATEX_PRECOMPILE_PREAMBLE", "1") == "1"  # 是否将固定导言区预编译为格式文件复用
+LATEX_LLM_REPAIR = os.getenv("LATEX_LLM_REPAIR", "1") == "1"  # 文本块解读结果未通过LaTeX校验时，是否请求模型修复该块
 LATEX_TEMPLATE = """
 \\documentclass[12pt]{article}
 \\usepackage{xeCJK}
@@ -30,6 +89,7 @@ LATEX_TEMPLATE = """
 \\usepackage{amssymb}
 \\usepackage{hyperref}
 \\usepackage{url}
+\\csname endofdump\\endcsname
 
 \\setCJKmainfont{SimSun}
 \\setCJKsansfont{SimHei}
@@ -49,8 +109,9 @@ LATEX_TEMPLATE = """
 \\end{document}
 """
 
-# 创建必要的目录
-for dir_path in [OUTPUT_DIR, LOGS_DIR, PAPERS_DIR]:
-    if not dir_path.exists():
-        dir_path.mkdir(parents=True)
-        print(f"创建目录：{dir_path}") 
\ No newline at end of file
+def ensure_directories() -> None:
+    """创建输出、日志、论文与缓存目录，由程序入口与 PaperProcessor 显式调用（导入本模块不会写磁盘）"""
+    for dir_path in [OUTPUT_DIR, LOGS_DIR, PAPERS_DIR, CACHE_DIR]:
+        if not dir_path.exists():
+            dir_path.mkdir(parents=True, exist_ok=True)
+            print(f"创建目录：{dir_path}")
@@ -0,0 +1,115 @@
+import glob
+import time
+import threading
+from collections import defaultdict
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+from src.config.settings import PAPERS_DIR, MAX_CONCURRENT_PAPERS
+from src.core.job import JobManifest
+from src.core.processor import PaperProcessor
+from src.utils.helpers import get_file_prefix
+
+def collect_pdfs(targets: List[str]) -> List[Path]:
+    """将目录、通配符或文件路径展开为PDF文件列表（去重并保持顺序）
+
+    相对路径先按当前目录解析，找不到时再按 Papers 目录解析。
+    """
+    pdfs = []
+    for target in targets:
+        candidates = [Path(target)]
+        if not Path(target).is_absolute():
+            candidates.append(PAPERS_DIR / target)
+        for candidate in candidates:
+            if candidate.is_dir():
+                matches = sorted(candidate.glob("*.pdf"))
+            else:
+                matches = [Path(p) for p in sorted(glob.glob(str(candidate)))]
+            matches = [p for p in matches if p.suffix.lower() == ".pdf" and p.is_file()]
+            if matches:
+                pdfs.extend(matches)
+                break
+    unique = {}
+    for pdf in pdfs:
+        unique.setdefault(pdf.resolve(), pdf)
+    return list(unique.values())
+
+class BatchRunner:
+    """批量处理多篇论文
+
+    所有论文共享同一个 PaperProcessor（即同一个模型客户端、请求并发上限与限流器），
+    多篇论文同时进行，使一篇论文在提取或编译时其他论文的请求仍能占满API配额。
+    """
+
+    def __init__(self, processor: Optional[PaperProcessor] = None, max_concurrent_papers: int = MAX_CONCURRENT_PAPERS):
+        self.processor = processor or PaperProcessor()
+        self.max_concurrent_papers = max(1, max_concurrent_papers)
+        # 同名论文共用任务目录，同一时间只允许处理一篇
+        self._paper_locks = defaultdict(threading.Lock)
+
+    def run(self, pdf_paths: List[Path], force: bool = False) -> List[Dict]:
+        """处理所有论文，返回与输入顺序一致的结果列表
+
+        不同目录下的同名论文（或文件名前缀相同的论文）会共用任务目录与输出文件，只处理其中第一篇。
+        """
+        results = [None] * len(pdf_paths)
+        owners = {}
+        for i, pdf_path in enumerate(pdf_paths):
+            for key in (JobManifest.job_name(str(pdf_path)), get_file_prefix(pdf_path.name)):
+                if key in owners and owners[key] != pdf_path:
+                    results[i] = self._conflict_result(pdf_path, owners[key])
+                    break
+            else:
+                owners[JobManifest.job_name(str(pdf_path))] = pdf_path
+                owners[get_file_prefix(pdf_path.name)] = pdf_path
+        pending = [i for i, result in enumerate(results) if result is None]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrent_papers, max(1, len(pending)))) as executor:
+            futures = {
+                executor.submit(self._run_one, pdf_paths[i], force): i
+                for i in pending
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        return results
+
+    @staticmethod
+    def _conflict_result(pdf_path: Path, owner: Path) -> Dict:
+        return {"paper": pdf_path.name, "status": f"跳过（与 {owner} 的任务目录或输出文件重名，请重命名后单独处理）",
+                "seconds": 0.0, "chunks": 0, "tokens": 0, "outputs": None}
+
+    def _run_one(self, pdf_path: Path, force: bool) -> Dict:
+        with self._paper_locks[JobManifest.job_name(str(pdf_path))]:
+            return self._process_one(pdf_path, force)
+
+    def _process_one(self, pdf_path: Path, force: bool) -> Dict:
+        result = {"paper": pdf_path.name, "status": "", "seconds": 0.0, "chunks": 0, "tokens": 0, "outputs": None}
+        if not force and JobManifest.for_pdf(str(pdf_path)).is_complete():
+            result["status"] = "跳过（已是最新）"
+            return result
+
+        stats = {}
+        start = time.time()
+        try:
+            tex_path, compiled_path, md_path = self.processor.process_pdf(str(pdf_path), stats, force)
+            result["status"] = "成功" if compiled_path else "成功（PDF编译失败）"
+            result["outputs"] = (tex_path, compiled_path, md_path)
+        except Exception as e:
+            result["status"] = f"失败：{str(e)}"
+        result["seconds"] = time.time() - start
+        result["chunks"] = stats.get("chunks", 0)
+        result["tokens"] = stats.get("prompt_tokens", 0) + stats.get("completion_tokens", 0)
+        return result
+
+    @staticmethod
+    def format_summary(results: List[Dict]) -> str:
+        """生成汇总表格"""
+        header = f"{'论文':<40}{'耗时(s)':>10}{'tokens':>10}{'文本块':>8}  状态"
+        lines = [header, "-" * len(header)]
+        for r in results:
+            lines.append(f"{r['paper'][:38]:<40}{r['seconds']:>10.1f}{r['tokens']:>10}{r['chunks']:>8}  {r['status']}")
+        lines.append("-" * len(header))
+        lines.append(
+            f"{'合计':<40}{sum(r['seconds'] for r in results):>10.1f}"
+            f"{sum(r['tokens'] for r in results):>10}{sum(r['chunks'] for r in results):>8}"
+        )
+        return "\n".join(lines)
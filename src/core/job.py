@@ -0,0 +1,229 @@
+import os
+import re
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional
+from src.config.settings import JOBS_DIR
+from src.utils.cache import file_sha256, content_hash
+
+# arXiv编号后的版本号，如 2401.01234v2
+_ARXIV_VERSION = re.compile(r'^(\d{4}\.\d{4,5})v\d+$')
+
+class JobManifest:
+    """单篇论文处理任务的检查点
+
+    每个阶段完成后写入任务目录（JOBS_DIR/<论文文件名>），再次处理同一PDF时
+    从最后完成的阶段和文本块继续。PDF内容变化时检查点自动失效，
+    但上一版本的分块方案与各文本块的解读结果会保留下来，供修订版复用。
+    arXiv修订版（如 2401.01234v1 与 v2）各自使用独立的任务目录，新版本只读地汇总其他版本目录中的结果。
+    """
+
+    MANIFEST_FILE = "manifest.json"
+    PREVIOUS_RUN_FILE = "previous_run.json"
+
+    def __init__(self, job_dir: Path, pdf_hash: str, reset: bool = False):
+        self.job_dir = Path(job_dir)
+        self.pdf_hash = pdf_hash
+        self.data = {"pdf_sha256": pdf_hash, "stages": {}}
+
+        manifest_path = self.job_dir / self.MANIFEST_FILE
+        if manifest_path.exists() and not reset:
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("pdf_sha256") == pdf_hash:
+                    self.data = data
+            except (OSError, ValueError):
+                pass
+        if self.data.get("stages"):
+            self._previous = None
+            return
+        # 新任务或PDF已变化，清空旧的检查点，仅保留上一版本的分块方案与解读结果；强制重新处理时全部清空
+        self._previous = {"plan": [], "results": {}} if reset else self._collect_previous_run()
+        if self.job_dir.exists():
+            shutil.rmtree(self.job_dir)
+        self.job_dir.mkdir(parents=True)
+        if self._previous["results"]:
+            self._write_file(self.PREVIOUS_RUN_FILE, json.dumps(self._previous, ensure_ascii=False))
+        self._write_manifest()
+
+    @classmethod
+    def for_pdf(cls, pdf_path: str, reset: bool = False) -> "JobManifest":
+        """根据PDF路径及其内容哈希打开（或新建）任务检查点，reset为True时清空已有检查点"""
+        return cls(JOBS_DIR / cls.job_name(pdf_path), file_sha256(pdf_path), reset)
+
+    @staticmethod
+    def job_name(pdf_path: str) -> str:
+        """任务目录名，即PDF文件名（不含扩展名）"""
+        return Path(pdf_path).stem
+
+    @staticmethod
+    def revision_key(name: str) -> str:
+        """同一论文各修订版共用的名称：arXiv编号去掉版本号，其他文件名保持不变"""
+        match = _ARXIV_VERSION.match(name)
+        return match.group(1) if match else name
+
+    @classmethod
+    def read_progress(cls, pdf_path: str) -> Dict:
+        """只读地查看任务进度，不会新建或重置检查点（供服务模式在处理过程中查询）
+
+        Returns:
+            Dict: 已完成的阶段(stages)、文本块总数(chunks_total)与已解读的块序号(chunks_done)
+        """
+        job_dir = JOBS_DIR / cls.job_name(pdf_path)
+        try:
+            with open(job_dir / cls.MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                stages = json.load(f).get("stages", {})
+        except (OSError, ValueError):
+            stages = {}
+        total = stages.get("segmentation") or 0
+        done = [i for i in range(total) if (job_dir / f"chunk_{i:03d}.tex").exists()]
+        return {"stages": list(stages), "chunks_total": total, "chunks_done": done}
+
+    @classmethod
+    def read_chunk_results(cls, pdf_path: str) -> Dict[int, str]:
+        """只读地读取已解读完成的文本块结果（块序号 -> LaTeX）"""
+        job_dir = JOBS_DIR / cls.job_name(pdf_path)
+        results = {}
+        for i in cls.read_progress(pdf_path)["chunks_done"]:
+            try:
+                with open(job_dir / f"chunk_{i:03d}.tex", 'r', encoding='utf-8') as f:
+                    results[i] = f.read()
+            except OSError:
+                continue
+        return results
+
+    @property
+    def resumed(self) -> bool:
+        """是否存在可恢复的已完成阶段"""
+        return bool(self.data["stages"])
+
+    def is_complete(self) -> bool:
+        """TEX、Markdown与PDF均已生成且文件仍存在"""
+        return all(
+            self.is_done(stage) and os.path.exists(self.get(stage))
+            for stage in ("tex", "markdown", "compile")
+        )
+
+    def is_done(self, stage: str) -> bool:
+        return stage in self.data["stages"]
+
+    def get(self, stage: str):
+        return self.data["stages"].get(stage)
+
+    def mark_done(self, stage: str, value=True) -> None:
+        self.data["stages"][stage] = value
+        self._write_manifest()
+
+    def invalidate(self, *stages: str) -> None:
+        """使指定阶段失效（如有新的解读结果时需重新生成文档）"""
+        for stage in stages:
+            self.data["stages"].pop(stage, None)
+        self._write_manifest()
+
+    def save_text(self, text: str) -> None:
+        self._write_file("text.txt", text)
+        self.mark_done("extraction")
+
+    def load_text(self) -> str:
+        return self._read_file("text.txt")
+
+    def save_chunks(self, chunks: List[str], plan: Optional[List[List[str]]] = None) -> None:
+        """保存文本块；plan为各文本块所含章节片段的内容哈希，供下一版本对齐分块"""
+        self._write_file("chunks.json", json.dumps(chunks, ensure_ascii=False))
+        if plan is not None:
+            self._write_file("plan.json", json.dumps(plan))
+        self.mark_done("segmentation", len(chunks))
+
+    def load_chunks(self) -> List[str]:
+        return json.loads(self._read_file("chunks.json"))
+
+    def save_chunk_result(self, index: int, result: str) -> None:
+        self._write_file(f"chunk_{index:03d}.tex", result)
+
+    def has_chunk_result(self, index: int) -> bool:
+        return (self.job_dir / f"chunk_{index:03d}.tex").exists()
+
+    def load_chunk_result(self, index: int) -> Optional[str]:
+        if not self.has_chunk_result(index):
+            return None
+        return self._read_file(f"chunk_{index:03d}.tex")
+
+    def previous_plan(self) -> Optional[List[List[str]]]:
+        """上一版本PDF的分块方案，不存在时返回None"""
+        if self._previous is None:
+            self._previous = self._load_previous_run()
+        return self._previous["plan"] or None
+
+    def previous_result(self, chunk: str) -> Optional[str]:
+        """上一版本中内容相同（忽略空白差异）的文本块的解读结果"""
+        if self._previous is None:
+            self._previous = self._load_previous_run()
+        return self._previous["results"].get(content_hash(chunk))
+
+    def _load_previous_run(self) -> Dict:
+        try:
+            return json.loads(self._read_file(self.PREVIOUS_RUN_FILE))
+        except (OSError, ValueError):
+            return {"plan": [], "results": {}}
+
+    def _collect_previous_run(self) -> Dict:
+        """汇总旧检查点与其他修订版任务目录中的分块方案与已完成的解读结果
+
+        优先使用本目录旧检查点的分块方案，否则使用最近更新的其他版本的方案；
+        其他版本的目录只读取、不修改，可与其处理过程同时进行。
+        """
+        previous = self._load_previous_run() if self.job_dir.exists() else {"plan": [], "results": {}}
+        key = self.revision_key(self.job_dir.name)
+        siblings = []
+        if self.job_dir.parent.exists():
+            siblings = sorted(
+                (path for path in self.job_dir.parent.iterdir()
+                 if path.is_dir() and path != self.job_dir and self.revision_key(path.name) == key),
+                key=lambda path: (path / self.MANIFEST_FILE).stat().st_mtime if (path / self.MANIFEST_FILE).exists() else 0
+            )
+        # 按优先级从低到高合并，后合并的方案与结果覆盖先前的
+        for job_dir in siblings + [self.job_dir]:
+            plan, results = self._read_run(job_dir)
+            if plan:
+                previous["plan"] = plan
+            previous["results"].update(results)
+        return previous
+
+    @staticmethod
+    def _read_run(job_dir: Path):
+        """读取任务目录中的分块方案与各文本块的解读结果（按文本块内容哈希索引）"""
+        try:
+            with open(job_dir / "chunks.json", 'r', encoding='utf-8') as f:
+                chunks = json.load(f)
+        except (OSError, ValueError):
+            return [], {}
+        try:
+            with open(job_dir / "plan.json", 'r', encoding='utf-8') as f:
+                plan = json.load(f)
+        except (OSError, ValueError):
+            plan = []
+        results = {}
+        for i, chunk in enumerate(chunks):
+            try:
+                with open(job_dir / f"chunk_{i:03d}.tex", 'r', encoding='utf-8') as f:
+                    results[content_hash(chunk)] = f.read()
+            except OSError:
+                continue
+        return plan, results
+
+    def _write_manifest(self) -> None:
+        self._write_file(self.MANIFEST_FILE, json.dumps(self.data, ensure_ascii=False, indent=2))
+
+    def _write_file(self, name: str, content: str) -> None:
+        # 先写临时文件再替换，避免中断时留下不完整的检查点
+        path = self.job_dir / name
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _read_file(self, name: str) -> str:
+        with open(self.job_dir / name, 'r', encoding='utf-8') as f:
+            return f.read()
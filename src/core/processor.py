@@ -1,119 +1,145 @@
 import os
-from typing import Tuple
-from openai import OpenAI
-from src.config.settings import OPENAI_API_KEY, OPENAI_BASE_URL, MAX_CHUNKS
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from src.config.settings import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, DEFAULT_MODEL, MAX_CHUNKS, MAX_CONCURRENT_CHUNKS, MAX_CONCURRENT_REQUESTS,
+    SECTION_LLM_FALLBACK, LATEX_LLM_REPAIR, LONG_DOCUMENT_MODE, LONG_DOCUMENT_MAX_CHUNKS, ensure_directories
+)
+from src.core.job import JobManifest
+from src.core.summarizer import DocumentSummarizer
 from src.extractors.pdf_extractor import PdfExtractor
+from src.handlers.content_pruner import ContentPruner
 from src.handlers.text_processor import TextProcessor
-from src.handlers.latex_handler import LatexHandler
-from src.utils.helpers import AIHelper, get_file_prefix, find_section_using_regex, Logger
+from src.handlers.latex_handler import LatexHandler, IncrementalDocumentWriter
+from src.utils.helpers import AIHelper, get_file_prefix, find_section_using_regex, Logger, run_in_job_context
+from src.utils.cache import content_hash
+from src.utils.metrics import RunReport
+from src.utils.tokens import count_tokens, token_budget
 
 class PaperProcessor:
     def __init__(self):
         if not all([OPENAI_API_KEY, OPENAI_BASE_URL]):
             raise ValueError("请设置所需的环境变量 OPENAI_API_KEY 和 OPENAI_BASE_URL")
         
-        self.client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
+        ensure_directories()
+        from openai import OpenAI
+
+        # 重试统一由 AIHelper 按限流状态协调，关闭客户端自带的重试
+        self.client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0)
         self.ai_helper = AIHelper(self.client)
         
-    def process_pdf(self, pdf_path: str) -> Tuple[str, str, str]:
+    def process_pdf(self, pdf_path: str, stats: Optional[Dict] = None, force: bool = False) -> Tuple[str, str, str]:
         """处理PDF文件的主函数
+
+        各阶段耗时、每次模型调用的耗时/重试/token用量以及写入字节数会记录到
+        处理日志旁的 *_report.jsonl（逐条事件）与 *_report.json（汇总）中。
+
+        Args:
+            pdf_path: PDF文件路径
+            stats: 可选的统计字典，处理过程中写入文本块数量(chunks)、token用量
+                (prompt_tokens/completion_tokens)与各阶段耗时(stages)，供批量模式与基准测试汇总；
+                长文档模式下另写入概要文件路径(summary)
+            force: 为True时清空任务检查点，从头重新处理（不复用已有的文本块解读与输出文件）
         
         Returns:
             Tuple[str, str, str]: 返回(tex文件路径, pdf文件路径, markdown文件路径)
             注意：如果PDF编译失败，pdf_path将为None
         """
+        stats = {} if stats is None else stats
+        report = None
         try:
             # 获取原始文件名并设置日志
             original_filename = os.path.basename(pdf_path)
             logger = Logger.setup(original_filename)
+            report = RunReport.for_logger(logger, original_filename)
             
             logger.info(f"开始处理PDF文件：{pdf_path}")
             
-            # 提取文本
-            logger.info("开始提取PDF文本")
-            text = PdfExtractor.extract_text(pdf_path)
-            if not text:
-                logger.error("无法提取PDF文本")
-                raise Exception("无法提取PDF文本")
-            logger.info("PDF文本提取成功")
-
-            # 分块处理（这里我把识别关了，即设置为0）
-            logger.info("开始文本分块")
-            chunks = TextProcessor.split_into_chunks(text)
-            if len(chunks) > MAX_CHUNKS:
-                logger.error(f"文档过长，超出处理限制（当前块数：{len(chunks)}，最大限制：{MAX_CHUNKS}）")
-                raise Exception("文档过长，超出处理限制")
-            if len(chunks) <= 0:
-                logger.error("识别到内容非论文")
-                raise Exception("识别到内容非论文")
-
-            logger.info(f"初始文本块数量：{len(chunks)}")
-            
-            # 处理不完整的章节
-            logger.info("开始处理不完整章节")
-            for i in range(len(chunks) - 1):
-                logger.info(f"\n检查第 {i + 1}/{len(chunks)} 个文本块")
-                last_incomplete_section = self.ai_helper.find_last_incomplete_section(chunks[i])
-                logger.info(f"找到的最后不完整小节名：{last_incomplete_section or '无'}")
-                
-                if last_incomplete_section:
-                    index, match = find_section_using_regex(chunks[i], last_incomplete_section)
-                    if index != -1:
-                        incomplete_part = chunks[i][index:]
-                        chunks[i] = chunks[i][:index]
-                        chunks[i + 1] = incomplete_part + chunks[i + 1]
-                        logger.info(f"转移到下一小节的前20个字符：{incomplete_part[:20]}")
-                    else:
-                        logger.warning(f"未找到不完整小节 {last_incomplete_section} 在当前文本块中的位置")
+            job = JobManifest.for_pdf(pdf_path, reset=force)
+            if force:
+                logger.info("强制重新处理，已清空任务检查点")
+            elif job.resumed:
+                logger.info(f"发现任务检查点，已完成阶段：{', '.join(job.data['stages'])}")
+
+            # 提取文本并按章节结构分块（逐页流水线：提取的同时开始章节切分）
+            with report.stage("extraction_segmentation"):
+                if job.is_done("segmentation"):
+                    chunks = job.load_chunks()
+                    logger.info(f"从检查点恢复文本块，数量：{len(chunks)}")
                 else:
-                    logger.info("当前文本块没有不完整的小节")
-
-            # 合并小文本块
-            logger.info("开始合并小文本块")
-            chunks = TextProcessor.merge_small_chunks(chunks)
-            logger.info(f"合并后的文本块数量：{len(chunks)}")
-
-            # 处理每个文本块
-            logger.info("开始处理文本块")
-            processed_chunks = []
-            for i, chunk in enumerate(chunks):
-                cleaned_chunk = TextProcessor.clean_text_for_processing(chunk)
-                logger.info(f"处理第 {i + 1}/{len(chunks)} 个文本块")
-                result = self.ai_helper.process_chunk(cleaned_chunk, i, len(chunks))
-                if result:
-                    processed_chunks.append(result)
-                    logger.info(f"第 {i + 1} 个文本块处理成功")
-                logger.info(f"处理进度：{int((i + 1) / len(chunks) * 100)}%")
-
-            if not processed_chunks:
-                logger.error("处理文本失败")
-                raise Exception("处理文本失败")
-
-            # 生成最终文档
-            logger.info("开始生成最终文档")
-            processed_text = "\n\n".join(processed_chunks)
-            cleaned_text = TextProcessor.clean_text_for_latex(processed_text)
+                    if job.is_done("extraction"):
+                        logger.info("从检查点恢复PDF文本")
+                        pages = [job.load_text()]
+                    else:
+                        logger.info("开始提取PDF文本")
+                        pages = self._extract_pages(pdf_path, job, logger, report)
+                    groups = self._segment_text(pages, logger, report, job.previous_plan())
+                    chunks = ["\n".join(group) for group in groups]
+                    job.save_chunks(chunks, [[content_hash(piece) for piece in group] for group in groups])
+            stats["chunks"] = len(chunks)
+            report.count("chunks", len(chunks))
+            # 超过MAX_CHUNKS的长文档：放宽块内并发（实际请求数仍受共享并发上限约束），解读完成后分层生成概要
+            long_document = len(chunks) > MAX_CHUNKS
+            workers = max(MAX_CONCURRENT_CHUNKS, MAX_CONCURRENT_REQUESTS) if long_document else MAX_CONCURRENT_CHUNKS
+
+            # 处理每个文本块，并按原文顺序增量写入TEX与Markdown文件
             file_prefix = get_file_prefix(original_filename)
-            
-            # 保存和编译
-            logger.info("开始保存TEX文件")
-            tex_path = LatexHandler.save_to_tex(cleaned_text, file_prefix, logger)
-            logger.info(f"TEX文件保存成功：{tex_path}")
-            
-            # 生成Markdown文件
-            logger.info("开始生成Markdown文件")
-            md_path = LatexHandler.convert_to_markdown(cleaned_text, file_prefix, logger)
-            logger.info(f"Markdown文件生成成功：{md_path}")
+            documents_current = (
+                all(job.is_done(stage) and os.path.exists(job.get(stage)) for stage in ("tex", "markdown"))
+                and all(job.has_chunk_result(i) for i in range(len(chunks)))
+            )
+            if documents_current:
+                tex_path, md_path = job.get("tex"), job.get("markdown")
+                logger.info(f"从检查点恢复TEX文件：{tex_path}")
+                logger.info(f"从检查点恢复Markdown文件：{md_path}")
+            else:
+                job.invalidate("tex", "markdown", "compile", "summary")
+                logger.info(f"开始处理文本块（并发数：{min(workers, len(chunks))}）")
+                with report.stage("interpretation"):
+                    writer = IncrementalDocumentWriter(file_prefix, len(chunks), logger, report)
+                    try:
+                        succeeded = self._process_chunks(chunks, logger, job, report, writer, workers)
+                    finally:
+                        tex_path, md_path = writer.close()
+                logger.info(f"模型响应缓存：{self.ai_helper.cache.stats()}")
+                logger.info(f"近似重复文本块：{self.ai_helper.dedup.stats()}")
+
+                if not succeeded:
+                    logger.error("处理文本失败")
+                    raise Exception("处理文本失败")
+                job.mark_done("tex", tex_path)
+                job.mark_done("markdown", md_path)
+                logger.info(f"TEX文件保存成功：{tex_path}")
+                logger.info(f"Markdown文件生成成功：{md_path}")
+
+            if long_document:
+                if job.is_done("summary") and os.path.exists(job.get("summary")):
+                    stats["summary"] = job.get("summary")
+                    logger.info(f"从检查点恢复长文档概要：{stats['summary']}")
+                else:
+                    with report.stage("summary"):
+                        summarizer = DocumentSummarizer(self.ai_helper, job, logger, report, workers)
+                        summary_path = summarizer.summarize(chunks, file_prefix)
+                    if summary_path:
+                        stats["summary"] = summary_path
+                        job.mark_done("summary", summary_path)
             
             # 尝试编译PDF，但不中断执行
             pdf_path = None
-            try:
-                logger.info("开始编译PDF文件")
-                pdf_path = LatexHandler.compile_tex(tex_path, original_filename, logger)
-                logger.info(f"PDF文件编译成功：{pdf_path}")
-            except Exception as e:
-                logger.error(f"PDF编译失败：{str(e)}")
-                logger.info("继续执行，返回其他文件路径")
+            if job.is_done("compile") and os.path.exists(job.get("compile")):
+                pdf_path = job.get("compile")
+                logger.info(f"从检查点恢复PDF文件：{pdf_path}")
+            else:
+                try:
+                    logger.info("开始编译PDF文件")
+                    with report.stage("compile"):
+                        pdf_path = LatexHandler.compile_tex(tex_path, original_filename, logger, report)
+                    job.mark_done("compile", pdf_path)
+                    logger.info(f"PDF文件编译成功：{pdf_path}")
+                except Exception as e:
+                    logger.error(f"PDF编译失败：{str(e)}")
+                    logger.info("继续执行，返回其他文件路径")
             
             return tex_path, pdf_path, md_path
 
@@ -122,4 +148,181 @@ class PaperProcessor:
                 logger.error(f"处理PDF时出错: {str(e)}")
             else:
                 print(f"处理PDF时出错: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+        finally:
+            if report:
+                summary = report.close()
+                stats.update(summary["tokens"])
+                stats["stages"] = summary["stages"]
+                logger.info(f"运行报告已保存：{report.summary_path}")
+            if 'logger' in locals():
+                Logger.close(logger)
+
+    def _extract_pages(self, pdf_path: str, job: JobManifest, logger: logging.Logger,
+                       report: RunReport) -> Iterator[str]:
+        """逐页产出裁剪后的PDF正文，全部提取完成后写入检查点"""
+        pages = []
+        pruner = ContentPruner(total_pages=PdfExtractor.page_count(pdf_path))
+        for page in pruner.iter_pages(PdfExtractor.iter_pages(pdf_path)):
+            pages.append(page)
+            yield page
+        text = "\n".join(pages)
+        if not text.strip():
+            logger.error("无法提取PDF文本")
+            raise Exception("无法提取PDF文本")
+        job.save_text(text)
+        report.count("pages", len(pages))
+        report.count("extracted_chars", len(text))
+        report.count("pdf_bytes", os.path.getsize(pdf_path))
+        logger.info(f"PDF文本提取成功，共 {len(pages)} 页")
+        pruned_chars = sum(pruner.removed.values())
+        pruned_tokens = sum(pruner.removed_tokens().values())
+        report.count("pruned_chars", pruned_chars)
+        report.count("pruned_tokens", pruned_tokens)
+        logger.info(f"内容裁剪移除 {pruned_chars} 字符（约 {pruned_tokens} tokens）：{pruner.summary()}")
+
+    def _segment_text(self, pages: Iterable[str], logger: logging.Logger, report: RunReport,
+                      previous_plan: Optional[List[List[str]]] = None) -> List[List[str]]:
+        """按章节结构将逐页文本切分为待解读的文本块，返回每个文本块包含的章节片段
+
+        存在上一版本的分块方案时，未变化的章节保持原有分块，以便直接复用其解读结果。
+        """
+        logger.info("开始章节切分")
+        sections = list(TextProcessor.iter_sections(pages))
+        logger.info(f"识别到章节数量：{len(sections)}")
+        budget = token_budget(DEFAULT_MODEL)
+        if SECTION_LLM_FALLBACK:
+            sections = [
+                piece for section in sections
+                for piece in (self._split_section_with_llm(section, logger, report)
+                              if count_tokens(section) > budget["chunk_tokens"] else [section])
+            ]
+        chunks = TextProcessor.plan_chunk_groups(sections, budget["chunk_tokens"], previous=previous_plan)
+        limit = LONG_DOCUMENT_MAX_CHUNKS if LONG_DOCUMENT_MODE else MAX_CHUNKS
+        if len(chunks) > limit:
+            logger.error(f"文档过长，超出处理限制（当前块数：{len(chunks)}，最大限制：{limit}）")
+            raise Exception("文档过长，超出处理限制")
+        if len(chunks) > MAX_CHUNKS:
+            logger.info(f"文本块数量超过 {MAX_CHUNKS}，启用长文档模式：解读完成后生成章节概要与全文概要")
+        if len(chunks) <= 0:
+            logger.error("识别到内容非论文")
+            raise Exception("识别到内容非论文")
+
+        logger.info(f"文本块数量：{len(chunks)}（每块token上限：{budget['chunk_tokens']}）")
+        return chunks
+
+    def _split_section_with_llm(self, section: str, logger: logging.Logger, report: RunReport) -> List[str]:
+        """对超长章节按固定长度切片，再由模型识别不完整小节并调整切片边界"""
+        chunks = TextProcessor.split_into_chunks(section)
+        for i in range(len(chunks) - 1):
+            last_incomplete_section = self.ai_helper.find_last_incomplete_section(chunks[i], report=report)
+            logger.info(f"超长章节切片 {i + 1}/{len(chunks)} 的最后不完整小节名：{last_incomplete_section or '无'}")
+            if not last_incomplete_section:
+                continue
+            index, match = find_section_using_regex(chunks[i], last_incomplete_section)
+            if index > 0:
+                chunks[i + 1] = chunks[i][index:] + chunks[i + 1]
+                chunks[i] = chunks[i][:index]
+            else:
+                logger.warning(f"未找到不完整小节 {last_incomplete_section} 在当前文本块中的位置")
+        return chunks
+
+    def _process_chunks(self, chunks: List[str], logger: logging.Logger, job: JobManifest,
+                        report: RunReport, writer: IncrementalDocumentWriter,
+                        workers: int = MAX_CONCURRENT_CHUNKS) -> int:
+        """并发解读所有文本块，结果按原文块顺序交给写入器
+
+        每个文本块独立提交并独立重试（见 AIHelper.process_chunk），
+        单个块失败只记录错误并跳过，不影响其他块。
+        已在检查点中保存的块直接复用，每个块完成后立即写入检查点，并加入跨论文的近似重复索引。
+
+        Returns:
+            int: 成功解读的文本块数量
+        """
+        total = len(chunks)
+        pending = []
+        succeeded = 0
+        reused = 0
+        shared = 0
+        for i in range(total):
+            result = job.load_chunk_result(i)
+            if result is None:
+                # 论文修订后内容未变化的文本块直接复用上一版本的解读
+                result = job.previous_result(chunks[i])
+                if result is not None:
+                    job.save_chunk_result(i, result)
+                    reused += 1
+            if result is None:
+                # 与其他论文中已解读的文本块近似重复（共用的背景、相关工作等）时复用其解读
+                match = self.ai_helper.dedup.find(chunks[i])
+                if match:
+                    result = match.result
+                    job.save_chunk_result(i, result)
+                    shared += 1
+                    report.count("shared_chunk_tokens", count_tokens(chunks[i]))
+                    logger.info(f"第 {i + 1}/{total} 个文本块与 {match.source} 近似重复"
+                                f"（相似度 {match.similarity:.2f}），复用其解读")
+            if result is None:
+                pending.append(i)
+            else:
+                succeeded += 1
+                writer.add(i, result)
+        if reused:
+            report.count("reused_chunks", reused)
+            logger.info(f"复用上一版本中 {reused}/{total} 个未变化文本块的解读")
+        if shared:
+            report.count("shared_chunks", shared)
+            logger.info(f"复用其他论文中 {shared}/{total} 个近似重复文本块的解读")
+        if len(pending) < total - reused - shared:
+            logger.info(f"从检查点恢复 {total - reused - shared - len(pending)}/{total} 个已解读的文本块")
+        if not pending:
+            return succeeded
+
+        completed = total - len(pending)
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+            futures = {}
+            for i in pending:
+                cleaned_chunk = TextProcessor.clean_text_for_processing(chunks[i])
+                futures[run_in_job_context(executor, self._interpret_chunk, cleaned_chunk, i, total, logger, report)] = i
+
+            for future in as_completed(futures):
+                i = futures[future]
+                completed += 1
+                result = None
+                try:
+                    result = future.result()
+                    job.save_chunk_result(i, result)
+                    self.ai_helper.dedup.add(chunks[i], f"{job.job_dir.name} 第 {i + 1} 块", result)
+                    succeeded += 1
+                    logger.info(f"第 {i + 1}/{total} 个文本块处理成功")
+                except Exception as e:
+                    logger.error(f"第 {i + 1}/{total} 个文本块处理失败：{str(e)}")
+                writer.add(i, result)
+                logger.info(f"处理进度：{int(completed / total * 100)}%（{completed}/{total}）")
+
+        return succeeded
+
+    def _interpret_chunk(self, chunk: str, index: int, total: int, logger: logging.Logger,
+                         report: RunReport) -> str:
+        """解读单个文本块并校验LaTeX
+
+        未通过校验的块（花括号、环境或公式定界符不配对）只针对该块请求模型修复，
+        修复结果问题更少时采用；仍残留的问题在写入时由 sanitize_latex 自动补齐，
+        避免整篇文档编译失败后再整体重跑。
+        """
+        result = self.ai_helper.process_chunk(chunk, index, total, report=report)
+        issues = TextProcessor.check_latex(result)
+        if not issues:
+            return result
+        report.count("latex_invalid_chunks")
+        logger.warning(f"第 {index + 1}/{total} 个文本块LaTeX校验未通过：{'；'.join(issues)}")
+        if LATEX_LLM_REPAIR:
+            repaired = self.ai_helper.repair_latex(result, issues, index, report)
+            # 修复结果明显变短说明模型删改了内容，此时不采用
+            if repaired and len(repaired) >= len(result) * 0.8:
+                remaining = TextProcessor.check_latex(repaired)
+                if len(remaining) < len(issues):
+                    report.count("latex_repaired_chunks")
+                    logger.info(f"第 {index + 1}/{total} 个文本块已由模型修复，剩余问题 {len(remaining)} 个")
+                    result = repaired
+        return result
@@ -0,0 +1,241 @@
+import re
+import json
+import time
+import uuid
+import queue
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs, unquote
+from src.config.settings import UPLOADS_DIR, MAX_CONCURRENT_PAPERS, MAX_UPLOAD_MB
+from src.core.job import JobManifest
+from src.core.processor import PaperProcessor
+from src.handlers.markdown_converter import latex_to_markdown
+
+_UNSAFE_FILENAME = re.compile(r'[^\w.\-]+')
+
+class PaperService:
+    """常驻的论文处理服务
+
+    上传的PDF进入优先级队列（priority越大越先处理，同优先级按提交顺序），
+    由固定数量的工作线程处理。所有任务共享同一个 PaperProcessor，
+    即同一个带连接池的模型客户端、请求并发上限、限流器与响应缓存，
+    不再为每篇论文重复启动进程和创建客户端。
+    """
+
+    def __init__(self, processor: Optional[PaperProcessor] = None, workers: int = MAX_CONCURRENT_PAPERS):
+        self.processor = processor or PaperProcessor()
+        self.workers = max(1, workers)
+        self.jobs: Dict[str, Dict] = {}
+        self._queue = queue.PriorityQueue()
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> "PaperService":
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"paper-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self) -> None:
+        """等待正在处理的任务完成后停止工作线程，排队中的任务不再处理"""
+        for i, _ in enumerate(self._threads):
+            self._queue.put((float("-inf"), i, None))
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, filename: str, data: bytes, priority: int = 0, force: bool = False) -> Dict:
+        """保存上传的PDF并加入队列，返回任务信息"""
+        if not data.startswith(b"%PDF"):
+            raise ValueError("上传内容不是PDF文件")
+        name = _UNSAFE_FILENAME.sub("_", Path(filename or "paper.pdf").name) or "paper.pdf"
+        if not name.lower().endswith(".pdf"):
+            name += ".pdf"
+        job_id = uuid.uuid4().hex[:12]
+        # 保存的文件名以任务ID开头，任务目录与输出文件前缀（文件名前12个字符）因此不会与其他上传的同名论文冲突
+        pdf_path = UPLOADS_DIR / job_id / f"{job_id}_{name}"
+        pdf_path.parent.mkdir(parents=True, exist_ok=True)
+        pdf_path.write_bytes(data)
+
+        job = {
+            "id": job_id, "paper": name, "pdf_path": str(pdf_path), "priority": priority, "force": force,
+            "status": "queued", "error": None, "outputs": None, "stats": {},
+            "submitted_at": time.time(), "started_at": None, "finished_at": None,
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+            self._sequence += 1
+            self._queue.put((-priority, self._sequence, job_id))
+        return self.status(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """取消排队中的任务，已开始处理的任务无法取消"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if not job or job["status"] != "queued":
+                return False
+            job["status"] = "cancelled"
+            job["finished_at"] = time.time()
+            return True
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """任务状态，处理中的任务附带文本块进度"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if not job:
+                return None
+            info = {key: value for key, value in job.items() if key not in ("pdf_path", "force")}
+            info["stats"] = dict(job["stats"])
+            info["queue_position"] = self._queue_position(job_id)
+        if job["status"] in ("running", "done", "failed"):
+            progress = JobManifest.read_progress(job["pdf_path"])
+            info["chunks_total"] = progress["chunks_total"]
+            info["chunks_done"] = len(progress["chunks_done"])
+        return info
+
+    def list_jobs(self) -> List[Dict]:
+        with self._lock:
+            job_ids = list(self.jobs)
+        return [self.status(job_id) for job_id in job_ids]
+
+    def partial_results(self, job_id: str) -> Optional[List[Dict]]:
+        """已解读完成的文本块（LaTeX与对应的Markdown），任务未完成时也可查看"""
+        job = self.jobs.get(job_id)
+        if not job:
+            return None
+        results = JobManifest.read_chunk_results(job["pdf_path"])
+        return [{"index": i, "latex": latex, "markdown": latex_to_markdown(latex)}
+                for i, latex in sorted(results.items())]
+
+    def output_path(self, job_id: str, kind: str) -> Optional[str]:
+        """已生成的输出文件路径，kind为tex/pdf/md"""
+        job = self.jobs.get(job_id)
+        if not job or not job["outputs"]:
+            return None
+        return dict(zip(("tex", "pdf", "md"), job["outputs"])).get(kind)
+
+    def _queue_position(self, job_id: str) -> Optional[int]:
+        if self.jobs[job_id]["status"] != "queued":
+            return None
+        waiting = sorted(entry for entry in self._queue.queue if entry[2] and self.jobs[entry[2]]["status"] == "queued")
+        return next((i for i, entry in enumerate(waiting) if entry[2] == job_id), None)
+
+    def _worker(self) -> None:
+        while True:
+            _, _, job_id = self._queue.get()
+            if job_id is None:
+                return
+            with self._lock:
+                job = self.jobs[job_id]
+                if job["status"] != "queued":
+                    continue
+                job["status"] = "running"
+                job["started_at"] = time.time()
+            self._run(job)
+
+    def _run(self, job: Dict) -> None:
+        pdf_path = job["pdf_path"]
+        status, error, outputs = "done", None, None
+        try:
+            outputs = self.processor.process_pdf(pdf_path, job["stats"], job["force"])
+        except Exception as e:
+            status, error = "failed", str(e)
+        with self._lock:
+            job.update(status=status, error=error, outputs=outputs, finished_at=time.time())
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    """HTTP接口
+
+    POST   /jobs?filename=x.pdf&priority=1&force=1   请求体为PDF内容，返回任务信息
+    GET    /jobs                                      全部任务
+    GET    /jobs/<id>                                 任务状态与文本块进度
+    GET    /jobs/<id>/chunks                          已解读完成的文本块
+    GET    /jobs/<id>/files/<tex|pdf|md>              下载输出文件
+    DELETE /jobs/<id>                                 取消排队中的任务
+    """
+
+    protocol_version = "HTTP/1.1"
+    service: PaperService = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        parts = self._path_parts()
+        if parts == ["health"]:
+            return self._send_json(200, {"status": "ok"})
+        if parts == ["jobs"]:
+            return self._send_json(200, self.service.list_jobs())
+        if len(parts) == 2 and parts[0] == "jobs":
+            return self._send_found(self.service.status(parts[1]))
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "chunks":
+            return self._send_found(self.service.partial_results(parts[1]))
+        if len(parts) == 4 and parts[0] == "jobs" and parts[2] == "files":
+            return self._send_file(self.service.output_path(parts[1], parts[3]))
+        self._send_json(404, {"error": "未知的接口"})
+
+    def do_POST(self):
+        if self._path_parts() != ["jobs"]:
+            return self._send_json(404, {"error": "未知的接口"})
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            return self._send_json(400, {"error": "请求体为空"})
+        if length > MAX_UPLOAD_MB * 1024 * 1024:
+            return self._send_json(413, {"error": f"文件超过 {MAX_UPLOAD_MB} MB"})
+        data = self.rfile.read(length)
+        query = parse_qs(urlparse(self.path).query)
+        filename = query.get("filename", [self.headers.get("X-Filename", "paper.pdf")])[0]
+        try:
+            priority = int(query.get("priority", ["0"])[0])
+            job = self.service.submit(filename, data, priority, force=query.get("force", ["0"])[0] == "1")
+        except ValueError as e:
+            return self._send_json(400, {"error": str(e)})
+        self._send_json(201, job)
+
+    def do_DELETE(self):
+        parts = self._path_parts()
+        if len(parts) == 2 and parts[0] == "jobs":
+            if self.service.cancel(parts[1]):
+                return self._send_json(200, self.service.status(parts[1]))
+            return self._send_json(409, {"error": "任务不存在或已开始处理"})
+        self._send_json(404, {"error": "未知的接口"})
+
+    def _path_parts(self) -> List[str]:
+        return [unquote(part) for part in urlparse(self.path).path.split("/") if part]
+
+    def _send_found(self, payload) -> None:
+        if payload is None:
+            self._send_json(404, {"error": "任务不存在"})
+        else:
+            self._send_json(200, payload)
+
+    def _send_json(self, status: int, payload) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, path: Optional[str]) -> None:
+        if not path or not Path(path).is_file():
+            return self._send_json(404, {"error": "文件尚未生成"})
+        data = Path(path).read_bytes()
+        content_types = {".pdf": "application/pdf", ".tex": "text/plain; charset=utf-8",
+                         ".md": "text/markdown; charset=utf-8"}
+        self.send_response(200)
+        self.send_header("Content-Type", content_types.get(Path(path).suffix, "application/octet-stream"))
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def make_server(service: PaperService, host: str, port: int) -> ThreadingHTTPServer:
+    """创建绑定到给定服务的HTTP服务器"""
+    handler = type("ServiceHandler", (_ServiceHandler,), {"service": service})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    return httpd
@@ -0,0 +1,111 @@
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from src.config.settings import OUTPUT_DIR, DEFAULT_MODEL, MAX_CONCURRENT_CHUNKS
+from src.core.job import JobManifest
+from src.handlers.text_processor import TextProcessor
+from src.handlers.markdown_converter import write_markdown
+from src.utils.helpers import AIHelper, CHAPTER_SUMMARY_PROMPT, DOCUMENT_SUMMARY_PROMPT, run_in_job_context
+from src.utils.metrics import RunReport
+from src.utils.tokens import token_budget
+
+# 归约的最大轮数，防止概要无法继续缩短时反复请求
+MAX_REDUCE_ROUNDS = 4
+_CHAPTER_NUMBER = re.compile(r'^([A-H]|\d{1,2})(?=[.\s])')
+
+class DocumentSummarizer:
+    """长文档的分层归约：章节概要与全文概要
+
+    各文本块的解读（映射步骤）已逐块写入任务检查点，这里按章节从磁盘读取解读结果，
+    并发生成各章节概要，再由章节概要生成全文概要。输入超出单次请求的token预算时，
+    先分批归纳再合并归纳，内存中只保留当前章节的解读与各章节概要。
+    """
+
+    def __init__(self, ai_helper: AIHelper, job: JobManifest, logger: logging.Logger, report: RunReport,
+                 workers: int = MAX_CONCURRENT_CHUNKS):
+        self.ai_helper = ai_helper
+        self.job = job
+        self.logger = logger
+        self.report = report
+        self.workers = max(1, workers)
+
+    @staticmethod
+    def group_chapters(chunks: List[str]) -> List[List[int]]:
+        """按一级章节将文本块编号分组：文本块中第一个章节标题的一级编号变化时开始新的章节"""
+        chapters = []
+        current = None
+        for i, chunk in enumerate(chunks):
+            key = DocumentSummarizer._chapter_key(chunk)
+            if not chapters or (key is not None and key != current):
+                chapters.append([])
+                current = key if key is not None else current
+            chapters[-1].append(i)
+        return chapters
+
+    @staticmethod
+    def _chapter_key(chunk: str) -> Optional[str]:
+        for line in chunk.split('\n'):
+            stripped = line.strip()
+            if TextProcessor.is_section_heading(stripped):
+                match = _CHAPTER_NUMBER.match(stripped)
+                return match.group(1) if match else stripped.split()[0].lower()
+        return None
+
+    def summarize(self, chunks: List[str], file_prefix: str) -> Optional[str]:
+        """生成章节概要与全文概要并写入Markdown文件，返回文件路径（全部失败时返回None）"""
+        chapters = self.group_chapters(chunks)
+        self.logger.info(f"开始生成长文档概要：{len(chapters)} 个章节")
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [run_in_job_context(executor, self._summarize_chapter, chapter) for chapter in chapters]
+            chapter_summaries = [future.result() for future in futures]
+            self.report.count("chapter_summaries", sum(1 for summary in chapter_summaries if summary))
+
+            summaries = [summary for summary in chapter_summaries if summary]
+            if not summaries:
+                self.logger.error("所有章节概要均生成失败")
+                return None
+            document_summary = self._reduce(summaries, DOCUMENT_SUMMARY_PROMPT, "document_summary", executor)
+
+        md_path = str(OUTPUT_DIR / f"{file_prefix}_概要.md")
+        with open(md_path, 'w', encoding='utf-8') as f:
+            for i, summary in enumerate(([document_summary] if document_summary else []) + summaries):
+                if i:
+                    f.write("\n\n")
+                write_markdown(TextProcessor.clean_text_for_latex(summary), f)
+        self.logger.info(f"长文档概要已保存：{md_path}")
+        return md_path
+
+    def _summarize_chapter(self, indices: List[int]) -> Optional[str]:
+        results = [result for result in (self.job.load_chunk_result(i) for i in indices) if result]
+        if not results:
+            return None
+        summary = self._reduce(results, CHAPTER_SUMMARY_PROMPT, "chapter_summary")
+        self.logger.info(f"第 {indices[0] + 1}-{indices[-1] + 1} 个文本块的章节概要"
+                         f"{'已生成' if summary else '生成失败'}")
+        return summary
+
+    def _reduce(self, texts: List[str], prompt_template: str, kind: str,
+                executor: Optional[ThreadPoolExecutor] = None) -> Optional[str]:
+        """将texts装入不超过token预算的批次分别归纳，批次多于一个时对归纳结果继续归纳
+
+        给定executor时各批次并发归纳（章节概要在线程池内执行，批次按顺序归纳以免嵌套提交）。
+        """
+        budget = token_budget(DEFAULT_MODEL)["chunk_tokens"]
+        batches = TextProcessor.plan_chunks(texts, budget)
+        summarize = lambda batch: self.ai_helper.summarize(prompt_template, batch, kind, self.report)
+        for _ in range(MAX_REDUCE_ROUNDS):
+            if executor:
+                results = [future.result() for future in
+                           [run_in_job_context(executor, summarize, batch) for batch in batches]]
+            else:
+                results = map(summarize, batches)
+            summaries = [summary for summary in results if summary]
+            if len(summaries) <= 1:
+                return summaries[0] if summaries else None
+            next_batches = TextProcessor.plan_chunks(summaries, budget)
+            if len(next_batches) >= len(batches):
+                # 归纳结果无法再合并，直接拼接
+                return "\n\n".join(summaries)
+            batches = next_batches
+        return "\n\n".join(batches)
@@ -1,25 +1,100 @@
-import PyPDF2
-from typing import Optional
+import os
+import logging
+from pathlib import Path
+from typing import Iterator, List, Optional
+from src.config.settings import CACHE_DIR, PDF_EXTRACT_WORKERS, PDF_PAGES_PER_TASK
+from src.utils.cache import file_sha256
+from src.handlers.content_pruner import ContentPruner
+
+PAGE_CACHE_DIR = CACHE_DIR / "pages"
+_log = logging.getLogger("texpap")
+
+def _extract_page_range(pdf_path: str, cache_dir: str, start: int, end: int) -> List[str]:
+    """提取[start, end)范围内各页的文本，优先读取逐页缓存（在子进程中执行）"""
+    cache_dir = Path(cache_dir)
+    reader = None
+    pages = []
+    for i in range(start, end):
+        cache_file = cache_dir / f"{i:05d}.txt"
+        if cache_file.exists():
+            pages.append(cache_file.read_text(encoding='utf-8'))
+            continue
+        if reader is None:
+            import PyPDF2
+            reader = PyPDF2.PdfReader(pdf_path)
+        text = reader.pages[i].extract_text() or ""
+        tmp_file = cache_file.with_name(cache_file.name + ".tmp")
+        tmp_file.write_text(text, encoding='utf-8')
+        os.replace(tmp_file, cache_file)
+        pages.append(text)
+    return pages
 
 class PdfExtractor:
     @staticmethod
     def extract_text(pdf_path: str) -> Optional[str]:
         """从PDF文件中提取文本"""
         try:
-            with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text()
-                return PdfExtractor.remove_references(text)
+            return "\n".join(PdfExtractor.iter_text(pdf_path))
         except Exception as e:
-            print(f"PDF文本提取失败: {str(e)}")
+            _log.error(f"PDF文本提取失败: {str(e)}")
             return None
 
+    @staticmethod
+    def iter_text(pdf_path: str) -> Iterator[str]:
+        """按页顺序逐页产出裁剪后的正文文本（去除页眉页脚、参考文献等，见 ContentPruner）"""
+        pruner = ContentPruner(total_pages=PdfExtractor.page_count(pdf_path))
+        yield from pruner.iter_pages(PdfExtractor.iter_pages(pdf_path))
+
+    @staticmethod
+    def iter_pages(pdf_path: str, workers: int = PDF_EXTRACT_WORKERS) -> Iterator[str]:
+        """按页顺序逐页产出文本
+
+        页面按 PDF_PAGES_PER_TASK 分段交给进程池并行提取，结果按顺序产出，
+        调用方无需等待全部页面提取完成即可开始处理。每页结果按PDF内容哈希缓存，
+        同一文件再次提取时直接读取缓存。
+        """
+        cache_dir = PAGE_CACHE_DIR / file_sha256(pdf_path)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        page_count = PdfExtractor._page_count(pdf_path, cache_dir)
+        ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count))
+                  for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+
+        if workers <= 1 or len(ranges) <= 1:
+            for start, end in ranges:
+                yield from _extract_page_range(pdf_path, str(cache_dir), start, end)
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(ranges)))
+        try:
+            futures = [executor.submit(_extract_page_range, pdf_path, str(cache_dir), start, end)
+                       for start, end in ranges]
+            for future in futures:
+                yield from future.result()
+        finally:
+            # 调用方提前停止（如裁剪时遇到参考文献）时取消尚未开始的分段
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def page_count(pdf_path: str) -> int:
+        """PDF页数（结果缓存）"""
+        cache_dir = PAGE_CACHE_DIR / file_sha256(pdf_path)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        return PdfExtractor._page_count(pdf_path, cache_dir)
+
+    @staticmethod
+    def _page_count(pdf_path: str, cache_dir: Path) -> int:
+        """读取页数，结果与逐页文本一起缓存"""
+        count_file = cache_dir / "page_count"
+        if count_file.exists():
+            return int(count_file.read_text())
+        import PyPDF2
+        page_count = len(PyPDF2.PdfReader(pdf_path).pages)
+        count_file.write_text(str(page_count))
+        return page_count
+
     @staticmethod
     def remove_references(text: str) -> str:
-        """移除参考文献部分"""
-        references_index = text.find('References')
-        if references_index != -1:
-            return text[:references_index]
-        return text 
\ No newline at end of file
+        """移除参考文献部分（仅识别单独成行、其后为参考文献条目的标题）"""
+        return "\n".join(ContentPruner(prune_appendix=True).iter_pages([text]))
@@ -0,0 +1,196 @@
+import re
+from collections import Counter, deque
+from typing import Deque, Dict, Iterable, Iterator, List, Optional
+from src.config.settings import PRUNE_APPENDIX, PRUNE_ACKNOWLEDGEMENTS
+from src.handlers.text_processor import TextProcessor
+from src.utils.tokens import count_tokens
+
+# 单独成行的参考文献标题，可带编号，如 "References"、"7 References"、"VI. REFERENCES"
+_REFERENCES_HEADING = re.compile(
+    r'^(?:\d{1,2}\.?\s+|[IVX]{1,4}\.\s+)?(?:References|Bibliography|Literature\s+Cited|参考文献)\s*$',
+    re.IGNORECASE
+)
+# 参考文献条目特征："[12] ..."、"12. Author"、出版年份
+_REFERENCE_ENTRY = re.compile(r'^\[\d{1,3}\]|^\d{1,3}\.\s+[A-Z]|\b(?:19|20)\d{2}[a-z]?\b')
+# 附录标题："Appendix A"、"Appendices"、"Appendix B: Proofs of Theorem 1"，标题部分需为简短的首字母大写短语
+_APPENDIX_HEADING = re.compile(
+    r'^(?:[A-H]\.?\s+)?(?:Appendix(?:\s+[A-Z](?:\.\d{1,2})?)?|APPENDIX(?:\s+[A-Z])?|Appendices|APPENDICES|'
+    r'Supplementary\s+Materials?)(?:[.:]?\s+(?P<title>[A-Z][^\n]*))?$'
+)
+# 换行截断的正文行常以这些词结尾，标题不会
+_TRAILING_WORDS = {"a", "an", "the", "of", "for", "and", "or", "to", "in", "on", "with", "by", "from", "that", "we"}
+_NUMBERED_TOP_HEADING = re.compile(r'^\d{1,2}\.?\s+[A-Z]')
+_ACKNOWLEDGEMENTS_HEADING = re.compile(r'^(?:\d{1,2}\.?\s+)?Acknowledge?ments?\s*$', re.IGNORECASE)
+# 页码残留：单独成行的页码、"Page 3"、"3 / 12"
+_PAGE_NUMBER = re.compile(r'^(?:\d{1,4}|page\s+\d{1,4}(?:\s+of\s+\d{1,4})?|\d{1,4}\s*/\s*\d{1,4})$', re.IGNORECASE)
+_DIGITS = re.compile(r'\d+')
+# 作者/年份格式的参考文献条目开头，如 "Vaswani, A., ..."
+_AUTHOR_ENTRY = re.compile(r"^[A-Z][A-Za-z'\-]+,\s+(?:[A-Z]\.\s*)+")
+
+# 每页首尾各取几行作为页眉页脚候选，过长的行视为正文
+EDGE_LINES = 3
+MAX_EDGE_LINE_CHARS = 80
+CATEGORIES = ("header_footer", "page_number", "references", "appendix", "acknowledgements")
+CATEGORY_NAMES = {
+    "header_footer": "页眉页脚", "page_number": "页码", "references": "参考文献",
+    "appendix": "附录", "acknowledgements": "致谢",
+}
+
+class ContentPruner:
+    """在提取与分块之间裁剪不需要解读的内容
+
+    逐页消费PDF文本（保留少量后续页面作为前瞻），去除：
+    - 多页重复出现在页面首尾的页眉页脚（数字视为相同，兼容带页码的页眉）与页码；
+    - 参考文献：仅识别单独成行的标题，且其后的内容确实像参考文献条目，正文中提到的 "References" 不受影响；
+    - 致谢，以及可选的附录（PRUNE_APPENDIX、PRUNE_ACKNOWLEDGEMENTS）。
+    裁剪附录时，遇到参考文献即停止读取后续页面。removed 记录各类被移除的字符数。
+    """
+
+    def __init__(self, total_pages: Optional[int] = None, prune_appendix: bool = PRUNE_APPENDIX,
+                 prune_acknowledgements: bool = PRUNE_ACKNOWLEDGEMENTS, lookahead: int = 3):
+        self.total_pages = total_pages
+        self.prune_appendix = prune_appendix
+        self.prune_acknowledgements = prune_acknowledgements
+        self.lookahead = max(1, lookahead)
+        self.removed: Dict[str, int] = {category: 0 for category in CATEGORIES}
+        self.finished = False
+        self._removed_text: Dict[str, List[str]] = {category: [] for category in CATEGORIES}
+        self._edge_counts = Counter()
+        self._pages_seen = 0
+        self._page_index = 0
+        self._mode = "body"
+
+    def iter_pages(self, pages: Iterable[str]) -> Iterator[str]:
+        """逐页产出裁剪后的文本；提前结束时关闭上游页面生成器（停止后续页面的提取）"""
+        buffer: Deque[List[str]] = deque()
+        try:
+            for page in pages:
+                lines = page.replace('\f', '\n').split('\n')
+                self._observe_edges(lines)
+                buffer.append(lines)
+                if len(buffer) > self.lookahead:
+                    yield self._prune_page(buffer.popleft(), buffer)
+                    if self.finished:
+                        return
+            while buffer and not self.finished:
+                yield self._prune_page(buffer.popleft(), buffer)
+        finally:
+            close = getattr(pages, "close", None)
+            if close:
+                close()
+
+    def removed_tokens(self) -> Dict[str, int]:
+        """各类被移除内容的token数"""
+        return {category: count_tokens("\n".join(texts)) if texts else 0
+                for category, texts in self._removed_text.items()}
+
+    def summary(self) -> str:
+        parts = [f"{CATEGORY_NAMES[category]} {chars}" for category, chars in self.removed.items() if chars]
+        return "，".join(parts) if parts else "无"
+
+    @staticmethod
+    def _normalize(line: str) -> str:
+        return _DIGITS.sub('#', ' '.join(line.lower().split()))
+
+    @staticmethod
+    def _edges(lines: List[str]) -> Dict[int, str]:
+        """页面首尾的候选行：{行号: "top"/"bottom"}，章节标题与过长的行除外"""
+        content = [i for i, line in enumerate(lines) if line.strip()]
+        edges = {i: "bottom" for i in content[-EDGE_LINES:]}
+        edges.update({i: "top" for i in content[:EDGE_LINES]})
+        return {i: side for i, side in edges.items()
+                if len(lines[i].strip()) <= MAX_EDGE_LINE_CHARS and not TextProcessor.is_section_heading(lines[i])}
+
+    def _observe_edges(self, lines: List[str]) -> None:
+        self._pages_seen += 1
+        self._edge_counts.update({(side, self._normalize(lines[i])) for i, side in self._edges(lines).items()})
+
+    def _is_repeated_edge(self, side: str, line: str) -> bool:
+        if self._pages_seen < 2:
+            return False
+        # 奇偶页的页眉常不同，各自出现在约一半页面上
+        threshold = 2 if self._pages_seen < 6 else max(3, int(self._pages_seen * 0.3))
+        return self._edge_counts[(side, self._normalize(line))] >= threshold
+
+    def _remove(self, category: str, line: str) -> None:
+        self.removed[category] += len(line) + 1
+        self._removed_text[category].append(line)
+
+    def _prune_page(self, lines: List[str], following: Deque[List[str]]) -> str:
+        edges = self._edges(lines)
+        kept = []
+        for i, line in enumerate(lines):
+            stripped = line.strip()
+            if not stripped:
+                if self._mode == "body":
+                    kept.append(line)
+                continue
+            if _PAGE_NUMBER.match(stripped):
+                self._remove("page_number", line)
+                continue
+            if i in edges and self._is_repeated_edge(edges[i], stripped):
+                self._remove("header_footer", line)
+                continue
+
+            if _REFERENCES_HEADING.match(stripped) and self._looks_like_bibliography(lines[i + 1:], following):
+                self._mode = "references"
+                if self.prune_appendix:
+                    # 参考文献之后只剩附录，不再提取后续页面
+                    for rest in [lines[i:]] + list(following):
+                        for removed in rest:
+                            if removed.strip():
+                                self._remove("references", removed)
+                    self.finished = True
+                    break
+            elif self.prune_acknowledgements and _ACKNOWLEDGEMENTS_HEADING.match(stripped):
+                self._mode = "acknowledgements"
+            elif self._is_appendix_heading(stripped) and self._in_latter_part(0.5):
+                self._mode = "appendix" if self.prune_appendix else "body"
+            elif self._mode == "acknowledgements" and TextProcessor.is_section_heading(stripped):
+                self._mode = "body"
+            elif (self._mode == "appendix" and _NUMBERED_TOP_HEADING.match(stripped)
+                  and TextProcessor.is_section_heading(stripped)):
+                # 附录小节以字母编号，出现数字编号的一级标题说明已回到正文
+                self._mode = "body"
+
+            if self._mode == "body":
+                kept.append(line)
+            else:
+                self._remove(self._mode, line)
+        self._page_index += 1
+        return '\n'.join(kept)
+
+    @staticmethod
+    def _is_appendix_heading(line: str) -> bool:
+        match = _APPENDIX_HEADING.match(line)
+        if not match:
+            return False
+        title = match.group("title")
+        if not title:
+            return True
+        words = title.split()
+        return (len(words) <= 8 and not title.endswith(('.', ',', ';', ':'))
+                and words[-1].lower() not in _TRAILING_WORDS)
+
+    def _in_latter_part(self, fraction: float) -> bool:
+        """当前页是否不在文档开头部分（页数未知或很短的文档不作限制）"""
+        return not (self.total_pages and self.total_pages > 4 and self._page_index < self.total_pages * fraction)
+
+    def _looks_like_bibliography(self, rest: List[str], following: Deque[List[str]]) -> bool:
+        """标题之后紧接参考文献条目（后续若干行中至少两条），且标题不在文档开头部分"""
+        if not self._in_latter_part(0.2):
+            return False
+        candidates = []
+        for lines in [rest] + list(following):
+            for line in lines:
+                stripped = line.strip()
+                if stripped and not _PAGE_NUMBER.match(stripped):
+                    candidates.append(stripped)
+                if len(candidates) >= 8:
+                    break
+            if len(candidates) >= 8:
+                break
+        if not candidates:
+            return True
+        matched = [bool(_REFERENCE_ENTRY.search(line) or _AUTHOR_ENTRY.match(line)) for line in candidates]
+        return matched[0] and sum(matched) >= min(2, len(candidates))
@@ -1,11 +1,30 @@
 import os
 import time
+import hashlib
+import threading
 import subprocess
 import logging
-import re
 from pathlib import Path
-from typing import Tuple
-from src.config.settings import OUTPUT_DIR, LOGS_DIR, LATEX_TEMPLATE
+from typing import Optional, Tuple
+from src.config.settings import (
+    OUTPUT_DIR, LOGS_DIR, CACHE_DIR, LATEX_TEMPLATE,
+    LATEX_COMPILE_TIMEOUT, MAX_CONCURRENT_COMPILES, LATEX_PRECOMPILE_PREAMBLE
+)
+from src.handlers.text_processor import TextProcessor
+from src.handlers.markdown_converter import latex_to_markdown, write_markdown
+from src.utils.metrics import RunReport
+
+LATEX_FORMAT_DIR = CACHE_DIR / "latex"
+_ENDOFDUMP = "\\csname endofdump\\endcsname"
+# .aux中影响交叉引用、目录与文献引用的行
+_AUX_REFERENCE_PREFIXES = ("\\newlabel", "\\bibcite", "\\@writefile")
+# 格式文件本身不可用时xelatex输出的信息（与文档内容中的LaTeX错误区分）
+_FORMAT_ERROR_MESSAGES = (
+    "can't find the format file", "Fatal format file error", "mylatexformat",
+)
+# 所有论文共享的编译并发上限
+_compile_slots = threading.BoundedSemaphore(max(1, MAX_CONCURRENT_COMPILES))
+_format_lock = threading.Lock()
 
 class LatexHandler:
     @staticmethod
@@ -20,8 +39,13 @@ class LatexHandler:
         return str(output_path)
 
     @staticmethod
-    def compile_tex(tex_path: str, original_filename: str, logger: logging.Logger = None) -> str:
-        """编译TEX文件为PDF"""
+    def compile_tex(tex_path: str, original_filename: str, logger: logging.Logger = None,
+                    report: RunReport = None) -> str:
+        """编译TEX文件为PDF
+
+        优先使用预编译的导言区格式文件；第一次编译后仅在交叉引用发生变化时才进行第二次编译。
+        编译数量受 MAX_CONCURRENT_COMPILES 限制，单次运行超过 LATEX_COMPILE_TIMEOUT 秒即终止。
+        """
         work_dir = os.path.dirname(tex_path)
         timestamp = time.strftime("%Y%m%d_%H%M%S")
         log_file = LOGS_DIR / f"{original_filename}_{timestamp}_compile.txt"
@@ -30,27 +54,48 @@ class LatexHandler:
             if logger:
                 logger.info(f"开始编译TEX文件：{tex_path}")
             
-            with open(log_file, 'w', encoding='utf-8') as f:
+            with _compile_slots, open(log_file, 'w', encoding='utf-8') as f:
                 f.write(f"开始编译 {tex_path}\n")
                 f.write(f"时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-                
+
+                fmt_name = LatexHandler._ensure_preamble_format(tex_path, f, logger)
                 for i in range(2):
                     if logger:
                         logger.info(f"第 {i+1} 次编译")
                     f.write(f"\n第 {i+1} 次编译:\n")
-                    result = subprocess.run([
-                        'xelatex',
-                        '-interaction=nonstopmode',
-                        f'-output-directory={work_dir}',
-                        tex_path
-                    ], capture_output=True, text=True, check=True)
+                    aux_before = LatexHandler._read_aux(tex_path)
+                    pass_start = time.time()
+                    try:
+                        result = LatexHandler._run_xelatex(tex_path, work_dir, fmt_name)
+                    except subprocess.CalledProcessError as e:
+                        # 文档内容本身的LaTeX错误在完整编译中同样会出现，直接报错，不丢弃格式文件
+                        if not fmt_name or not LatexHandler._is_format_error(e):
+                            raise
+                        # 格式文件不可用时退回完整编译
+                        if logger:
+                            logger.warning("使用预编译导言区编译失败，改为完整编译")
+                        f.write("使用预编译导言区编译失败，改为完整编译\n")
+                        LatexHandler._discard_format(fmt_name)
+                        fmt_name = None
+                        result = LatexHandler._run_xelatex(tex_path, work_dir, None)
                     
+                    if report:
+                        report.count("latex_passes")
+                        report.event("latex_pass", index=i + 1, seconds=round(time.time() - pass_start, 3),
+                                     precompiled_preamble=bool(fmt_name))
+
                     # 记录编译输出
                     f.write("\nSTDOUT:\n")
                     f.write(result.stdout)
                     f.write("\nSTDERR:\n")
                     f.write(result.stderr)
                     f.write("\n" + "="*50 + "\n")
+
+                    if i == 0 and not LatexHandler._needs_rerun(result.stdout, aux_before, LatexHandler._read_aux(tex_path)):
+                        if logger:
+                            logger.info("交叉引用无变化，跳过第二次编译")
+                        f.write("\n交叉引用无变化，跳过第二次编译\n")
+                        break
                 
                 f.write(f"\n编译完成\n时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
                 
@@ -59,19 +104,117 @@ class LatexHandler:
             with open(log_file, 'a', encoding='utf-8') as f:
                 f.write(f"\n编译失败！\n错误代码: {e.returncode}\n")
                 f.write("\nSTDOUT:\n")
-                f.write(e.stdout)
+                f.write(e.stdout or "")
                 f.write("\nSTDERR:\n")
-                f.write(e.stderr)
+                f.write(e.stderr or "")
             if logger:
                 logger.error(f"编译失败：{str(e)}")
             raise
+        except subprocess.TimeoutExpired as e:
+            with open(log_file, 'a', encoding='utf-8') as f:
+                f.write(f"\n编译超时！超过 {e.timeout} 秒\n")
+            if logger:
+                logger.error(f"编译超时：{str(e)}")
+            raise
         finally:
             # 清理编译过程中生成的临时文件
             LatexHandler.cleanup_temp_files(tex_path, logger)
             
         if logger:
             logger.info("编译完成")
-        return tex_path.replace('.tex', '.pdf')
+        pdf_path = tex_path.replace('.tex', '.pdf')
+        if report and os.path.exists(pdf_path):
+            report.record_bytes(pdf_path, os.path.getsize(pdf_path))
+        return pdf_path
+
+    @staticmethod
+    def _run_xelatex(tex_path: str, work_dir: str, fmt_name: Optional[str]) -> subprocess.CompletedProcess:
+        """运行一次xelatex，fmt_name不为空时使用预编译的导言区格式"""
+        command = ['xelatex', '-interaction=nonstopmode', f'-output-directory={work_dir}']
+        env = None
+        if fmt_name:
+            command.append(f'-fmt={fmt_name}')
+            env = dict(os.environ, TEXFORMATS=f"{LATEX_FORMAT_DIR}{os.pathsep}")
+        command.append(tex_path)
+        return subprocess.run(command, capture_output=True, text=True, check=True,
+                              timeout=LATEX_COMPILE_TIMEOUT, env=env)
+
+    @staticmethod
+    def _read_aux(tex_path: str) -> str:
+        aux_path = os.path.splitext(tex_path)[0] + '.aux'
+        if not os.path.exists(aux_path):
+            return ""
+        with open(aux_path, 'r', encoding='utf-8', errors='ignore') as f:
+            return f.read()
+
+    @staticmethod
+    def _needs_rerun(stdout: str, aux_before: str, aux_after: str) -> bool:
+        """判断是否需要再次编译：日志提示重新运行，或.aux中的引用/目录信息发生变化"""
+        if 'Rerun to get' in stdout or 'Label(s) may have changed' in stdout:
+            return True
+        references = lambda aux: [line for line in aux.splitlines() if line.startswith(_AUX_REFERENCE_PREFIXES)]
+        return references(aux_before) != references(aux_after)
+
+    @staticmethod
+    def _ensure_preamble_format(tex_path: str, log, logger: logging.Logger = None) -> Optional[str]:
+        """将文档中 \\endofdump 之前的固定导言区预编译为格式文件并返回格式名
+
+        格式文件按导言区内容哈希缓存于 LATEX_FORMAT_DIR，生成失败时返回None（退回完整编译）。
+        """
+        if not LATEX_PRECOMPILE_PREAMBLE:
+            return None
+        with open(tex_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        marker = content.find(_ENDOFDUMP)
+        if marker == -1:
+            return None
+
+        fmt_name = "texpap_" + hashlib.sha256(content[:marker].encode('utf-8')).hexdigest()[:16]
+        fmt_path = LATEX_FORMAT_DIR / f"{fmt_name}.fmt"
+        failed_marker = LATEX_FORMAT_DIR / f"{fmt_name}.failed"
+        with _format_lock:
+            if fmt_path.exists():
+                return fmt_name
+            if failed_marker.exists():
+                return None
+
+            if logger:
+                logger.info("开始预编译导言区格式文件")
+            log.write(f"预编译导言区格式文件：{fmt_path}\n")
+            LATEX_FORMAT_DIR.mkdir(parents=True, exist_ok=True)
+            try:
+                result = subprocess.run([
+                    'xelatex', '-ini', '-interaction=nonstopmode',
+                    f'-jobname={fmt_name}',
+                    f'-output-directory={LATEX_FORMAT_DIR}',
+                    '&xelatex', 'mylatexformat.ltx', tex_path
+                ], capture_output=True, text=True, timeout=LATEX_COMPILE_TIMEOUT)
+                log.write(result.stdout)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                log.write(f"预编译失败：{str(e)}\n")
+                result = None
+
+            if result is None or result.returncode != 0 or not fmt_path.exists():
+                if logger:
+                    logger.warning("导言区预编译失败，使用完整编译")
+                failed_marker.touch()
+                return None
+            return fmt_name
+
+    @staticmethod
+    def _is_format_error(error: subprocess.CalledProcessError) -> bool:
+        """编译失败是否由格式文件无法加载（或缺少 mylatexformat）引起"""
+        output = f"{error.stdout or ''}\n{error.stderr or ''}"
+        return any(message in output for message in _FORMAT_ERROR_MESSAGES)
+
+    @staticmethod
+    def _discard_format(fmt_name: str) -> None:
+        """删除无法使用的格式文件，并标记为失败以免重复生成"""
+        with _format_lock:
+            fmt_path = LATEX_FORMAT_DIR / f"{fmt_name}.fmt"
+            if fmt_path.exists():
+                fmt_path.unlink()
+            (LATEX_FORMAT_DIR / f"{fmt_name}.failed").touch()
 
     @staticmethod
     def cleanup_temp_files(tex_path: str, logger: logging.Logger = None) -> None:
@@ -104,45 +247,75 @@ class LatexHandler:
         if logger:
             logger.info("开始转换为Markdown格式")
         
-        # 移除LaTeX模板相关内容
-        content = text
-        
-        # 基本的LaTeX到Markdown转换规则
-        replacements = [
-            # 处理带星号和不带星号的section命令
-            (r'\\section\*?\{([^}]*)\}', r'# \1'),
-            (r'\\subsection\*?\{([^}]*)\}', r'## \1'),
-            (r'\\subsubsection\*?\{([^}]*)\}', r'### \1'),
-            (r'\\textbf\{([^}]*)\}', r'**\1**'),
-            (r'\\textit\{([^}]*)\}', r'*\1*'),
-            (r'\\cite\{([^}]*)\}', r'[\1]'),
-            (r'\\begin\{itemize\}', ''),
-            (r'\\end\{itemize\}', ''),
-            (r'\\item\s*', '- '),
-            (r'\\begin\{enumerate\}', ''),
-            (r'\\end\{enumerate\}', ''),
-            (r'\\begin\{equation\}(.*?)\\end\{equation\}', r'$$\1$$'),
-            (r'\$([^$]*)\$', r'$\1$'),
-            # 处理其他常见的LaTeX命令
-            (r'\\emph\{([^}]*)\}', r'*\1*'),
-            (r'\\texttt\{([^}]*)\}', r'`\1`'),
-            (r'\\chapter\*?\{([^}]*)\}', r'# \1'),
-            (r'\\paragraph\*?\{([^}]*)\}', r'#### \1'),
-            (r'\\subparagraph\*?\{([^}]*)\}', r'##### \1'),
-        ]
-        
-        for pattern, replacement in replacements:
-            content = re.sub(pattern, replacement, content, flags=re.MULTILINE | re.DOTALL)
-        
-        # 清理多余的空行
-        content = re.sub(r'\n\s*\n\s*\n', '\n\n', content)
-        
-        # 保存Markdown文件
+        # 边转换边写入Markdown文件
         output_path = OUTPUT_DIR / f"{file_prefix}_解析结果.md"
         with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+            write_markdown(text, f)
             
         if logger:
             logger.info(f"Markdown文件已保存：{output_path}")
             
-        return str(output_path) 
\ No newline at end of file
+        return str(output_path)
+
+    @staticmethod
+    def latex_to_markdown(text: str) -> str:
+        """将LaTeX格式的文本转换为Markdown文本（单次扫描，见 markdown_converter）"""
+        return latex_to_markdown(text)
+
+class IncrementalDocumentWriter:
+    """按原文块顺序增量写入TEX与Markdown文件
+
+    各文本块的解读结果可按任意顺序到达，写入器缓存尚未轮到的结果，
+    一旦前面的块全部就绪即立即追加到文件，无需等待全部块完成或拼接整篇文档。
+    """
+
+    def __init__(self, file_prefix: str, total: int, logger: logging.Logger = None, report: RunReport = None):
+        self.tex_path = str(OUTPUT_DIR / f"{file_prefix}_解析结果.tex")
+        self.md_path = str(OUTPUT_DIR / f"{file_prefix}_解析结果.md")
+        self.total = total
+        self.logger = logger
+        self.report = report
+        self.written = 0
+        self._next_index = 0
+        self._pending = {}
+        self._started_at = time.time()
+        self._tex_head, self._tex_tail = LATEX_TEMPLATE.split('%s', 1)
+        self._tex_file = open(self.tex_path, 'w', encoding='utf-8')
+        self._md_file = open(self.md_path, 'w', encoding='utf-8')
+        self._tex_file.write(self._tex_head)
+
+    def add(self, index: int, latex: Optional[str]) -> None:
+        """提交第index块的解读结果（失败的块传入None），并写出所有已就绪的连续块"""
+        self._pending[index] = latex
+        while self._next_index in self._pending:
+            latex = self._pending.pop(self._next_index)
+            self._next_index += 1
+            if not latex:
+                continue
+            cleaned = TextProcessor.clean_text_for_latex(latex)
+            separator = "\n\n" if self.written else ""
+            self._tex_file.write(separator + cleaned)
+            self._md_file.write(separator)
+            write_markdown(cleaned, self._md_file)
+            self._tex_file.flush()
+            self._md_file.flush()
+            self.written += 1
+            if self.written == 1:
+                elapsed = time.time() - self._started_at
+                if self.logger:
+                    self.logger.info(f"首个章节已写入，耗时 {elapsed:.1f} 秒")
+                if self.report:
+                    self.report.event("first_section_written", seconds=round(elapsed, 3))
+
+    def close(self) -> Tuple[str, str]:
+        """写入文档结尾并关闭文件，返回(tex文件路径, markdown文件路径)"""
+        self._tex_file.write(self._tex_tail)
+        self._tex_file.close()
+        self._md_file.close()
+        if self.report:
+            self.report.record_bytes(self.tex_path, os.path.getsize(self.tex_path))
+            self.report.record_bytes(self.md_path, os.path.getsize(self.md_path))
+        if self.logger:
+            self.logger.info(f"TEX文件已保存：{self.tex_path}")
+            self.logger.info(f"Markdown文件已保存：{self.md_path}")
+        return self.tex_path, self.md_path
@@ -0,0 +1,168 @@
+import re
+from typing import List, NamedTuple, Optional
+
+# 单次扫描的词法规则，顺序即优先级
+_SCANNER = re.compile(r'''
+    (?P<drop>```[A-Za-z]*|抱歉，我无法处理该请求)
+  | (?P<double_escaped>\\\\(?=[{}]))
+  | (?P<escaped>\\[%&\#_$^{}\\])
+  | (?P<command>\\[A-Za-z@]+\*?)
+  | (?P<math_delim>\\[()\[\]]|\$\$|\$)
+  | (?P<escape>\\.)
+  | (?P<special>[%&\#_^])
+  | (?P<lbrace>\{)
+  | (?P<rbrace>\})
+  | (?P<text>[^\\$%&\#_^{}`抱]+)
+  | (?P<other>.)
+''', re.VERBOSE | re.DOTALL)
+_ENV_NAME = re.compile(r'\s*\{([A-Za-z]+\*?)\}')
+
+# 参数按原样保留、其中特殊字符不转义的命令
+RAW_ARGUMENT_COMMANDS = {
+    "\\label", "\\ref", "\\eqref", "\\pageref", "\\cite", "\\citep", "\\citet",
+    "\\url", "\\href", "\\includegraphics", "\\input",
+}
+# 进入数学模式的环境
+MATH_ENVIRONMENTS = {
+    "equation", "equation*", "align", "align*", "alignat", "alignat*", "gather", "gather*",
+    "multline", "multline*", "eqnarray", "eqnarray*", "displaymath", "math",
+}
+# 以&作为列分隔符的环境，其中的&不转义
+ALIGNMENT_ENVIRONMENTS = MATH_ENVIRONMENTS | {"tabular", "tabular*", "tabularx", "array", "longtable"}
+_SPECIAL_ESCAPES = {"%": "\\%", "&": "\\&", "#": "\\#", "_": "\\_", "^": "\\^{}"}
+_MATH_CLOSERS = {"$": "$", "$$": "$$", "\\(": "\\)", "\\[": "\\]"}
+
+class LatexCheck(NamedTuple):
+    """清理结果：修复后的文本与发现的问题（问题为空表示无需修复）"""
+    text: str
+    issues: List[str]
+
+class _Sanitizer:
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.out: List[str] = []
+        self.issues: List[str] = []
+        self.braces: List[bool] = []  # 每层花括号是否为原样保留的命令参数
+        self.environments: List[str] = []
+        self.math: Optional[str] = None  # 当前行内/行间公式的结束定界符
+        self.raw_next = False
+
+    def run(self) -> LatexCheck:
+        text = self.text
+        while self.pos < len(text):
+            match = _SCANNER.match(text, self.pos)
+            self.pos = match.end()
+            kind = match.lastgroup
+            token = match.group()
+            raw_next, self.raw_next = self.raw_next, False
+            if kind == "drop":
+                continue
+            if kind == "double_escaped":
+                self.out.append("\\")
+            elif kind == "command":
+                self._command(token)
+            elif kind == "math_delim":
+                self._math_delimiter(token)
+            elif kind == "special":
+                self.out.append(token if self._keeps_special(token) else _SPECIAL_ESCAPES[token])
+            elif kind == "lbrace":
+                self.braces.append(raw_next or self._in_raw_argument())
+                self.out.append(token)
+            elif kind == "rbrace":
+                if self.braces:
+                    self.braces.pop()
+                    self.out.append(token)
+                else:
+                    self.issues.append(f"多余的右花括号（位置 {match.start()}）")
+            else:
+                self.out.append(token)
+        self._close_open_groups()
+        return LatexCheck("".join(self.out), self.issues)
+
+    def _in_math(self) -> bool:
+        return self.math is not None or any(env in MATH_ENVIRONMENTS for env in self.environments)
+
+    def _in_raw_argument(self) -> bool:
+        return bool(self.braces) and self.braces[-1]
+
+    def _keeps_special(self, char: str) -> bool:
+        if self._in_raw_argument():
+            return True
+        if char == "&":
+            return self._in_math() or any(env in ALIGNMENT_ENVIRONMENTS for env in self.environments)
+        if char in "_^":
+            return self._in_math()
+        return False
+
+    def _command(self, command: str) -> None:
+        if command in ("\\begin", "\\end"):
+            match = _ENV_NAME.match(self.text, self.pos)
+            if match:
+                self.pos = match.end()
+                if command == "\\begin":
+                    self._begin(match.group(1))
+                else:
+                    self._end(match.group(1))
+                return
+            self.issues.append(f"{command} 缺少环境名")
+            return
+        self.out.append(command)
+        self.raw_next = command in RAW_ARGUMENT_COMMANDS
+
+    def _begin(self, name: str) -> None:
+        self.environments.append(name)
+        self.out.append(f"\\begin{{{name}}}")
+
+    def _end(self, name: str) -> None:
+        if name not in self.environments:
+            self.issues.append(f"多余的 \\end{{{name}}}")
+            return
+        while self.environments[-1] != name:
+            unclosed = self.environments.pop()
+            self.issues.append(f"环境 {unclosed} 未闭合")
+            self.out.append(f"\\end{{{unclosed}}}")
+        self.environments.pop()
+        self.out.append(f"\\end{{{name}}}")
+
+    def _math_delimiter(self, token: str) -> None:
+        if self.math is None:
+            if token in _MATH_CLOSERS and not any(env in MATH_ENVIRONMENTS for env in self.environments):
+                self.math = _MATH_CLOSERS[token]
+                self.out.append(token)
+            else:
+                self.issues.append(f"多余的公式定界符 {token}")
+        elif token == self.math:
+            self.math = None
+            self.out.append(token)
+        elif token == "$$" and self.math == "$":
+            # 相邻的两个行内公式 $a$$b$：前一个$闭合公式，后一个$开始新公式
+            self.math = None
+            self.out.append("$")
+            self._math_delimiter("$")
+        else:
+            self.issues.append(f"公式定界符不匹配：期望 {self.math}，实际 {token}")
+
+    def _close_open_groups(self) -> None:
+        if self.math == "$" and self.out and self.out[-1] == "$":
+            # 片段末尾刚打开的空公式（如 $a$$ 中的最后一个$）直接删除，补齐后会变成行间公式定界符$$
+            self.out.pop()
+            self.issues.append("多余的公式定界符 $")
+        elif self.math is not None:
+            self.issues.append(f"公式未闭合，缺少 {self.math}")
+            self.out.append(self.math)
+        if self.braces:
+            self.issues.append(f"缺少 {len(self.braces)} 个右花括号")
+            self.out.append("}" * len(self.braces))
+        for name in reversed(self.environments):
+            self.issues.append(f"环境 {name} 未闭合")
+            self.out.append(f"\\end{{{name}}}")
+
+def sanitize_latex(text: str) -> LatexCheck:
+    """一次扫描完成LaTeX片段的清理、校验与修复
+
+    去除代码块标记，转义正文中的 % & # _ ^（公式、对齐环境与 \\label/\\ref 等参数中保留原样），
+    检查花括号、环境与公式定界符是否配对；多余的结束符被删除，未闭合的结构在片段末尾补齐。
+    返回的 issues 列出所有被修复的问题，供调用方决定是否重新生成该块。
+    """
+    return _Sanitizer(text).run()
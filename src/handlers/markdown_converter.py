@@ -0,0 +1,216 @@
+import re
+from typing import Iterable, Iterator, List, Optional, TextIO
+
+# 单次扫描的词法规则：命令、数学定界符、转义字符、花括号与普通文本
+_SCANNER = re.compile(r'''
+    (?P<command>\\[A-Za-z]+\*?)
+  | (?P<math_open>\\\(|\\\[|\$\$|\$)
+  | (?P<escape>\\.)
+  | (?P<lbrace>\{)
+  | (?P<rbrace>\})
+  | (?P<text>[^\\${}]+)
+  | (?P<other>.)
+''', re.VERBOSE | re.DOTALL)
+_BLANK_LINES = re.compile(r'\n\s*\n\s*\n')
+_ENV_NAME = re.compile(r'\s*\{([A-Za-z]+\*?)\}')
+
+SECTION_PREFIXES = {
+    "\\chapter": "# ", "\\section": "# ", "\\subsection": "## ", "\\subsubsection": "### ",
+    "\\paragraph": "#### ", "\\subparagraph": "##### ",
+}
+INLINE_WRAPPERS = {
+    "\\textbf": ("**", "**"), "\\textit": ("*", "*"), "\\emph": ("*", "*"),
+    "\\texttt": ("`", "`"), "\\cite": ("[", "]"),
+}
+# 参数按原样输出、不再转换的命令
+RAW_ARGUMENT_COMMANDS = {"\\texttt", "\\cite"}
+LIST_ENVIRONMENTS = {"itemize", "enumerate"}
+# 行间公式环境，值为 Markdown 公式块中包裹内容所用的环境（None表示直接输出内容）
+MATH_ENVIRONMENTS = {
+    "equation": None, "equation*": None, "displaymath": None,
+    "align": "aligned", "align*": "aligned", "gather": "gathered", "gather*": "gathered",
+    "multline": None, "multline*": None,
+}
+_MATH_CLOSERS = {"\\(": "\\)", "\\[": "\\]", "$$": "$$", "$": "$"}
+
+class _Converter:
+    """LaTeX子集到Markdown的单次扫描转换器
+
+    支持章节命令、textbf/textit/emph/texttt/cite、itemize/enumerate列表、
+    行间公式环境与 $...$、$$...$$、\\(...\\)、\\[...\\] 数学公式；命令参数按花括号配对读取，
+    可正确处理嵌套花括号。其他命令与环境按原样输出。
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.lists: List[List] = []  # 每层列表：[环境名, 当前编号]
+
+    def convert(self, depth: int = 0) -> Iterator[str]:
+        """从当前位置开始转换；depth>0时遇到配对的右花括号即返回"""
+        text = self.text
+        while self.pos < len(text):
+            match = _SCANNER.match(text, self.pos)
+            self.pos = match.end()
+            kind = match.lastgroup
+            token = match.group()
+            if kind == "text" or kind == "escape" or kind == "other":
+                yield token
+            elif kind == "lbrace":
+                yield "{"
+                yield from self.convert(depth + 1)
+                yield "}"
+            elif kind == "rbrace":
+                if depth > 0:
+                    return
+                yield token
+            elif kind == "math_open":
+                yield self._math(token)
+            else:
+                yield self._command(token)
+
+    def _command(self, command: str) -> str:
+        name = command.rstrip("*")
+        if name in SECTION_PREFIXES:
+            self._skip_optional_argument()
+            argument = self._argument(raw=False)
+            return command if argument is None else SECTION_PREFIXES[name] + argument
+        if name in INLINE_WRAPPERS:
+            argument = self._argument(raw=name in RAW_ARGUMENT_COMMANDS)
+            if argument is None:
+                return command
+            before, after = INLINE_WRAPPERS[name]
+            return f"{before}{argument}{after}"
+        if name == "\\item":
+            return self._item()
+        if name in ("\\begin", "\\end"):
+            return self._environment(name, command)
+        return command
+
+    def _item(self) -> str:
+        label = None
+        rest = self.text[self.pos:self.pos + 1]
+        if rest == "[":
+            end = self.text.find("]", self.pos)
+            if end != -1:
+                label = self.text[self.pos + 1:end]
+                self.pos = end + 1
+        self._skip_whitespace()
+        if self.lists and self.lists[-1][0] == "enumerate":
+            self.lists[-1][1] += 1
+            marker = f"{self.lists[-1][1]}. "
+        else:
+            marker = "- "
+        return marker + (f"**{label}** " if label else "")
+
+    def _environment(self, name: str, command: str) -> str:
+        match = _ENV_NAME.match(self.text, self.pos)
+        if not match:
+            return command
+        environment = match.group(1)
+        if environment in LIST_ENVIRONMENTS:
+            self.pos = match.end()
+            if name == "\\begin":
+                self.lists.append([environment, 0])
+            elif self.lists:
+                self.lists.pop()
+            return ""
+        if environment in MATH_ENVIRONMENTS and name == "\\begin":
+            closer = f"\\end{{{environment}}}"
+            end = self.text.find(closer, match.end())
+            if end == -1:
+                return command
+            content = self.text[match.end():end]
+            self.pos = end + len(closer)
+            inner = MATH_ENVIRONMENTS[environment]
+            if inner:
+                content = f"\\begin{{{inner}}}{content}\\end{{{inner}}}"
+            return f"$${content}$$"
+        return command
+
+    def _math(self, opener: str) -> str:
+        """原样保留公式内容，仅统一定界符：行内为$...$，行间为$$...$$"""
+        closer = _MATH_CLOSERS[opener]
+        end = self._find_unescaped(closer, self.pos)
+        if end == -1:
+            return opener
+        content = self.text[self.pos:end]
+        self.pos = end + len(closer)
+        delimiter = "$" if opener in ("$", "\\(") else "$$"
+        return f"{delimiter}{content}{delimiter}"
+
+    def _find_unescaped(self, needle: str, start: int) -> int:
+        while True:
+            index = self.text.find(needle, start)
+            if index == -1 or needle.startswith("\\"):
+                return index
+            backslashes = 0
+            while index - backslashes - 1 >= 0 and self.text[index - backslashes - 1] == "\\":
+                backslashes += 1
+            if backslashes % 2 == 0:
+                return index
+            start = index + 1
+
+    def _argument(self, raw: bool) -> Optional[str]:
+        """读取紧随其后的 {...} 参数；raw为True时原样返回，否则递归转换。无参数时返回None"""
+        self._skip_whitespace()
+        if self.text[self.pos:self.pos + 1] != "{":
+            return None
+        self.pos += 1
+        if not raw:
+            return "".join(self.convert(depth=1))
+        start = self.pos
+        depth = 1
+        while self.pos < len(self.text) and depth:
+            char = self.text[self.pos]
+            if char == "\\":
+                self.pos += 1
+            elif char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+            self.pos += 1
+        return self.text[start:self.pos - 1] if depth == 0 else self.text[start:self.pos]
+
+    def _skip_optional_argument(self) -> None:
+        if self.text[self.pos:self.pos + 1] == "[":
+            end = self.text.find("]", self.pos)
+            if end != -1:
+                self.pos = end + 1
+
+    def _skip_whitespace(self) -> None:
+        while self.pos < len(self.text) and self.text[self.pos] in " \t\r\n":
+            self.pos += 1
+
+def _collapse_blank_lines(pieces: Iterable[str]) -> Iterator[str]:
+    """将连续的多个空行压缩为一个空行；跨片段的空白会先合并再处理"""
+    whitespace = ""
+    for piece in pieces:
+        body = piece.strip()
+        if not body:
+            whitespace += piece
+            continue
+        leading = piece[:len(piece) - len(piece.lstrip())]
+        trailing = piece[len(piece.rstrip()):]
+        yield _BLANK_LINES.sub("\n\n", whitespace + leading)
+        yield _BLANK_LINES.sub("\n\n", body)
+        whitespace = trailing
+    if whitespace:
+        yield _BLANK_LINES.sub("\n\n", whitespace)
+
+def iter_markdown(text: str) -> Iterator[str]:
+    """逐段产出转换后的Markdown文本，整体为线性时间，不复制整篇文档"""
+    return _collapse_blank_lines(_Converter(text).convert())
+
+def latex_to_markdown(text: str) -> str:
+    """将LaTeX格式的文本转换为Markdown文本"""
+    return "".join(iter_markdown(text))
+
+def write_markdown(text: str, out: TextIO) -> int:
+    """将转换结果直接流式写入文件对象，返回写入的字符数"""
+    written = 0
+    for piece in iter_markdown(text):
+        if piece:
+            out.write(piece)
+            written += len(piece)
+    return written
@@ -1,6 +1,20 @@
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Tuple
 import re
-from src.config.settings import DEFAULT_CHUNK_SIZE, MIN_CHUNK_SIZE
+from src.config.settings import DEFAULT_CHUNK_SIZE, MIN_CHUNK_TOKENS, DEFAULT_MODEL
+from src.utils.cache import content_hash
+from src.utils.tokens import count_tokens
+from src.handlers.latex_sanitizer import sanitize_latex
+
+# 编号小节标题，如 "3.2 Relative Positional Encodings"、"4 Experiments"、"A.1 Proofs"
+_NUMBERED_HEADING = re.compile(r'^(?:\d{1,2}(?:\.\d{1,2}){0,3}|[A-H](?:\.\d{1,2}){1,3})\.?\s+[A-Z][^\n]{0,100}$')
+# 无编号的常见章节标记
+_NAMED_HEADING = re.compile(
+    r'^(?:Abstract|Introduction|Related\s+Work|Background|Conclusions?|Discussion|'
+    r'Acknowledge?ments?|Appendix(?:\s+[A-Z])?|Appendices|Supplementary\s+Material)\b[^\n]{0,80}$',
+    re.IGNORECASE
+)
+# 分页残留：单独成行的页码、"Page 3"、"3 / 12"，以及换页符
+_PAGE_ARTIFACT = re.compile(r'^(?:\d{1,4}|page\s+\d{1,4}(?:\s+of\s+\d{1,4})?|\d{1,4}\s*/\s*\d{1,4})$', re.IGNORECASE)
 
 class TextProcessor:
     @staticmethod
@@ -9,21 +23,129 @@ class TextProcessor:
         return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
 
     @staticmethod
-    def merge_small_chunks(chunks: List[str]) -> List[str]:
-        """合并小于指定大小的文本块"""
-        if len(chunks) <= 1:
-            return chunks
+    def is_section_heading(line: str) -> bool:
+        """判断一行文本是否为章节标题"""
+        line = line.strip()
+        if not line or len(line) > 120 or line.endswith(('.', ',', ';', ':')):
+            return False
+        match = _NUMBERED_HEADING.match(line)
+        if match:
+            # 排除 "2 The model ..." 这类以数字开头的正文长句
+            return len(line.split()) <= 12
+        return bool(_NAMED_HEADING.match(line))
+
+    @staticmethod
+    def iter_sections(pages: Iterable[str]) -> Iterator[str]:
+        """逐页消费文本并依次产出完整章节，可与PDF逐页提取流水线并行"""
+        current = []
+        for page in pages:
+            for line in page.replace('\f', '\n').split('\n'):
+                stripped = line.strip()
+                if _PAGE_ARTIFACT.match(stripped):
+                    continue
+                if TextProcessor.is_section_heading(stripped) and any(l.strip() for l in current):
+                    yield '\n'.join(current)
+                    current = []
+                current.append(line)
+        if any(l.strip() for l in current):
+            yield '\n'.join(current)
+
+    @staticmethod
+    def split_long_section(section: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[str]:
+        """将超长章节按段落、句子边界切分为不超过chunk_size的片段"""
+        if len(section) <= chunk_size:
+            return [section]
+
+        pieces = []
+        rest = section
+        while len(rest) > chunk_size:
+            window = rest[:chunk_size]
+            cut = window.rfind('\n\n')
+            if cut < chunk_size // 2:
+                cut = max(window.rfind('. '), window.rfind('。'))
+                cut = cut + 1 if cut >= chunk_size // 2 else chunk_size
+            pieces.append(rest[:cut])
+            rest = rest[cut:]
+        if rest.strip():
+            pieces.append(rest)
+        return pieces
+
+    @staticmethod
+    def plan_chunks(sections: List[str], max_tokens: int, min_tokens: int = MIN_CHUNK_TOKENS,
+                    model: str = DEFAULT_MODEL) -> List[str]:
+        """按token预算将完整章节装入文本块
+
+        章节依次装入不超过max_tokens的文本块；超长章节按其字符/token比例估算切分长度，
+        再按段落、句子边界切分。装箱后少于min_tokens的小块并入相邻块（不超出预算时）。
+        """
+        return ["\n".join(group) for group in TextProcessor.plan_chunk_groups(sections, max_tokens, min_tokens, model)]
+
+    @staticmethod
+    def plan_chunk_groups(sections: List[str], max_tokens: int, min_tokens: int = MIN_CHUNK_TOKENS,
+                          model: str = DEFAULT_MODEL, previous: Optional[List[List[str]]] = None) -> List[List[str]]:
+        """与 plan_chunks 相同，但返回每个文本块包含的章节片段列表
+
+        previous为上一次运行时各文本块所含片段的内容哈希（见 content_hash）。
+        新文本中与某个旧文本块片段完全一致的连续片段保持原有分块，
+        只有新增或修改的片段重新装箱，使论文修订后未变化的文本块内容与上次完全相同。
+        """
+        pieces = []
+        for section in sections:
+            tokens = count_tokens(section, model)
+            if tokens <= max_tokens:
+                pieces.append((section, tokens))
+                continue
+            chunk_size = max(1, int(len(section) * max_tokens / tokens * 0.95))
+            pieces.extend((piece, count_tokens(piece, model))
+                          for piece in TextProcessor.split_long_section(section, chunk_size))
+        if not previous:
+            return TextProcessor._pack_pieces(pieces, max_tokens, min_tokens)
+
+        hashes = [content_hash(piece) for piece, _ in pieces]
+        previous_by_first = {}
+        for group in previous:
+            if group:
+                previous_by_first.setdefault(group[0], []).append(group)
+
+        groups, fresh = [], []
+        i = 0
+        while i < len(pieces):
+            matches = [
+                group for group in previous_by_first.get(hashes[i], [])
+                if hashes[i:i + len(group)] == group
+                and sum(tokens for _, tokens in pieces[i:i + len(group)]) <= max_tokens
+            ]
+            if not matches:
+                fresh.append(pieces[i])
+                i += 1
+                continue
+            group = max(matches, key=len)
+            groups.extend(TextProcessor._pack_pieces(fresh, max_tokens, min_tokens))
+            fresh = []
+            groups.append([piece for piece, _ in pieces[i:i + len(group)]])
+            i += len(group)
+        groups.extend(TextProcessor._pack_pieces(fresh, max_tokens, min_tokens))
+        return groups
 
-        merged_chunks = [chunks[0]]
-        for i in range(1, len(chunks)):
-            current_chunk = chunks[i]
-            if len(current_chunk) < MIN_CHUNK_SIZE:
-                merged_chunks[-1] += current_chunk
+    @staticmethod
+    def _pack_pieces(pieces: List[Tuple[str, int]], max_tokens: int, min_tokens: int) -> List[List[str]]:
+        """贪心装箱，再将少于min_tokens的小块并入相邻块"""
+        packed = []
+        for piece, tokens in pieces:
+            if packed and packed[-1][1] + tokens <= max_tokens:
+                packed[-1] = (packed[-1][0] + [piece], packed[-1][1] + tokens)
             else:
-                merged_chunks.append(current_chunk)
+                packed.append(([piece], tokens))
 
-        print(f"合并小块后，文本块数量从 {len(chunks)} 减少到 {len(merged_chunks)}")
-        return merged_chunks
+        merged = []
+        for i, (group, tokens) in enumerate(packed):
+            if tokens < min_tokens and merged and merged[-1][1] + tokens <= max_tokens:
+                merged[-1] = (merged[-1][0] + group, merged[-1][1] + tokens)
+            elif tokens < min_tokens and i + 1 < len(packed) and packed[i + 1][1] + tokens <= max_tokens:
+                packed[i + 1] = (group + packed[i + 1][0], packed[i + 1][1] + tokens)
+            else:
+                merged.append((group, tokens))
+        return [group for group, _ in merged]
 
     @staticmethod
     def clean_text_for_processing(text: str) -> str:
@@ -32,17 +154,10 @@ class TextProcessor:
 
     @staticmethod
     def clean_text_for_latex(text: str) -> str:
-        """清理文本以用于LaTeX"""
-        cleaned_text = text
-        # 移除代码块标记和其他无关文本
-        cleaned_text = cleaned_text.replace('```', '')\
-            .replace('latex', '')\
-            .replace('抱歉，我无法处理该请求', '')
-        
-        # 处理特殊字符
-        cleaned_text = re.sub(r'(?<!\\)%', r'\\%', cleaned_text)  # 处理百分号
-        cleaned_text = re.sub(r'(?<!\\)&', r'\\&', cleaned_text)  # 处理&符号
-        cleaned_text = re.sub(r'(?<!\\)#', r'\\#', cleaned_text)  # 处理#符号
-        cleaned_text = re.sub(r'\\\\([{}])', r'\\\1', cleaned_text)  # 清理双重转义的花括号
-        
-        return cleaned_text 
\ No newline at end of file
+        """清理文本以用于LaTeX，并修复不配对的花括号、环境与公式定界符"""
+        return sanitize_latex(text).text
+
+    @staticmethod
+    def check_latex(text: str) -> List[str]:
+        """校验LaTeX片段，返回发现的问题列表（为空表示可直接编译）"""
+        return sanitize_latex(text).issues
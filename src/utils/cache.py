@@ -0,0 +1,100 @@
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional
+
+class ResponseCache:
+    """基于SQLite的模型响应缓存，键为(模型, 提示词模板, 温度, 文本块)的哈希"""
+
+    def __init__(self, db_path: Path, max_entries: int = 5000, max_age_days: float = 30, enabled: bool = True):
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if self.enabled:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+            self.evict()
+
+    @staticmethod
+    def make_key(model: str, prompt_template: str, temperature: float, chunk: str) -> str:
+        """计算缓存键"""
+        digest = hashlib.sha256()
+        for part in (model, prompt_template, repr(temperature), chunk):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存，未命中或已过期返回None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and time.time() - row[1] <= self.max_age_seconds:
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, response: str) -> None:
+        """写入缓存"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                (key, response, time.time())
+            )
+            self._conn.commit()
+        # 常驻服务长时间不重启，写入时即淘汰过期与超出上限的条目
+        self.evict()
+
+    def evict(self) -> int:
+        """删除过期条目，并在条目数超出上限时删除最旧的条目，返回删除数量"""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age_seconds,)
+            ).rowcount
+            removed += self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            self._conn.commit()
+            return removed
+
+    def stats(self) -> str:
+        """返回命中统计描述"""
+        if not self.enabled:
+            return "缓存已关闭"
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        return f"命中 {self.hits} 次，未命中 {self.misses} 次，命中率 {rate:.1f}%"
+
+def file_sha256(path: str) -> str:
+    """计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def content_hash(text: str) -> str:
+    """计算文本内容的SHA-256，忽略空白差异（同一章节重新提取时换行、空格可能不同）"""
+    return hashlib.sha256(" ".join(text.split()).encode('utf-8')).hexdigest()
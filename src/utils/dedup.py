@@ -0,0 +1,156 @@
+import re
+import time
+import random
+import sqlite3
+import struct
+import hashlib
+import threading
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+from src.utils.cache import content_hash
+
+# MinHash参数：64个哈希函数分为16个band（每个4行），估计相似度约0.5以上的文本块即可成为候选
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_WORDS = 5
+MIN_SHINGLES = 20  # 过短的文本块（如单独的标题）不参与去重
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1729)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(NUM_PERMUTATIONS)]
+_WORD = re.compile(r'\w+')
+_SIGNATURE_FORMAT = f"<{NUM_PERMUTATIONS}Q"
+
+class DuplicateMatch(NamedTuple):
+    """近似重复的已解读文本块：估计的相似度、来源（论文与块号）与其解读结果"""
+    similarity: float
+    source: str
+    result: str
+
+def minhash_signature(text: str) -> Optional[List[int]]:
+    """按词级shingle计算MinHash签名，文本过短时返回None"""
+    words = _WORD.findall(text.lower())
+    shingles = {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_WORDS]).encode('utf-8'), digest_size=8).digest(), 'little')
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    return [min((a * shingle + b) % _MERSENNE_PRIME for shingle in shingles) for a, b in _PERMUTATIONS]
+
+def estimate_similarity(first: List[int], second: List[int]) -> float:
+    """由两个MinHash签名估计shingle集合的Jaccard相似度"""
+    return sum(1 for x, y in zip(first, second) if x == y) / NUM_PERMUTATIONS
+
+def _band_keys(signature: List[int]) -> List[str]:
+    return [
+        hashlib.blake2b(struct.pack(f"<{ROWS_PER_BAND}Q", *signature[b * ROWS_PER_BAND:(b + 1) * ROWS_PER_BAND]),
+                        digest_size=8).hexdigest()
+        for b in range(BANDS)
+    ]
+
+class NearDuplicateIndex:
+    """跨论文的近似重复文本块索引（MinHash + LSH，基于SQLite存储在本地）
+
+    同一系列论文常复用背景、相关工作或预备知识段落，研讨会版与完整版论文更有大段相同内容。
+    每个解读成功的文本块连同其解读结果写入索引；处理新文本块前先查询索引，
+    估计相似度不低于threshold的文本块直接复用已有解读，不再请求模型。
+    """
+
+    def __init__(self, db_path: Path, threshold: float = 0.9, max_entries: int = 20000, enabled: bool = True):
+        self.db_path = Path(db_path)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if self.enabled:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "key TEXT PRIMARY KEY, signature BLOB NOT NULL, source TEXT NOT NULL, "
+                "result TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS bands (band INTEGER, band_key TEXT, key TEXT)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, band_key)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS bands_key ON bands (key)")
+            self._conn.commit()
+            self.evict()
+
+    def find(self, text: str) -> Optional[DuplicateMatch]:
+        """查找与text近似重复的已解读文本块，返回相似度最高的一个"""
+        if not self.enabled:
+            return None
+        signature = minhash_signature(text)
+        if signature is None:
+            return None
+        with self._lock:
+            candidates = set()
+            for band, band_key in enumerate(_band_keys(signature)):
+                candidates.update(row[0] for row in self._conn.execute(
+                    "SELECT key FROM bands WHERE band = ? AND band_key = ?", (band, band_key)
+                ))
+            best = None
+            for key in candidates:
+                row = self._conn.execute(
+                    "SELECT signature, source, result FROM chunks WHERE key = ?", (key,)
+                ).fetchone()
+                if not row:
+                    continue
+                similarity = estimate_similarity(signature, struct.unpack(_SIGNATURE_FORMAT, row[0]))
+                if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                    best = DuplicateMatch(similarity, row[1], row[2])
+            if best:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return best
+
+    def add(self, text: str, source: str, result: str) -> None:
+        """将已解读的文本块写入索引，source为来源描述（如论文名与块号）"""
+        if not self.enabled:
+            return
+        signature = minhash_signature(text)
+        if signature is None:
+            return
+        key = content_hash(text)
+        with self._lock:
+            self._conn.execute("DELETE FROM bands WHERE key = ?", (key,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunks (key, signature, source, result, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, struct.pack(_SIGNATURE_FORMAT, *signature), source, result, time.time())
+            )
+            self._conn.executemany(
+                "INSERT INTO bands (band, band_key, key) VALUES (?, ?, ?)",
+                [(band, band_key, key) for band, band_key in enumerate(_band_keys(signature))]
+            )
+            self._conn.commit()
+        # 常驻服务长时间不重启，写入时即淘汰超出上限的旧条目
+        self.evict()
+
+    def evict(self) -> int:
+        """条目数超出上限时删除最旧的条目，返回删除数量"""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM chunks WHERE key IN ("
+                "SELECT key FROM chunks ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            if removed:
+                self._conn.execute("DELETE FROM bands WHERE key NOT IN (SELECT key FROM chunks)")
+            self._conn.commit()
+            return removed
+
+    def stats(self) -> str:
+        """返回命中统计描述"""
+        if not self.enabled:
+            return "去重已关闭"
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        return f"复用 {self.hits} 次，未命中 {self.misses} 次，复用率 {rate:.1f}%"
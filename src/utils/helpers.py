@@ -1,92 +1,406 @@
 import os
 import re
 import time
+import queue
+import atexit
 import logging
-from typing import Tuple, Optional
-from openai import OpenAI
-from tenacity import retry, stop_after_attempt, wait_exponential
-from src.config.settings import DEFAULT_MODEL, LOGS_DIR
+import functools
+import itertools
+import threading
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Tuple, Optional
+from src.config.settings import (
+    DEFAULT_MODEL, LOGS_DIR, CACHE_DIR, LOG_LEVEL, CONSOLE_LOG_LEVEL,
+    LLM_CACHE_ENABLED, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_MAX_AGE_DAYS,
+    NEAR_DUPLICATE_ENABLED, NEAR_DUPLICATE_THRESHOLD, NEAR_DUPLICATE_MAX_ENTRIES,
+    MAX_CONCURRENT_REQUESTS, REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE, STREAM_RESPONSES,
+    MAX_RETRY_ATTEMPTS, CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN, EXPECTED_OUTPUT_RATIO
+)
+from src.utils.cache import ResponseCache
+from src.utils.dedup import NearDuplicateIndex
+from src.utils.metrics import RunReport
+from src.utils.rate_limiter import (
+    RateLimiter, AdaptiveConcurrency, CircuitBreaker, retry_after_seconds
+)
+from src.utils.tokens import count_tokens, token_budget
+
+PROCESS_CHUNK_PROMPT = '请对以下论文片段中每个完整的小节(如1.1视为一个章节）进行通俗易懂并条理清晰的解读(不对标题、作者、表格、参考文献进行解读)，解读要详略得当（不重要的部分简单概括即可，涉及公式和实现方法要详细解读）。只需要返回[小节（有数字编号优先使用原文的数字编号）]+[片段内容的解读（包含全部公式的详细解读）]。输出为中文且使用latex语言的格式包装，每一节内容解析为一个section，如\\section*，公式独立行展示，而一段话中的数学符号则用美元符号包裹，如"具有$O(N^2)$的时间"。注意！1. 分数命令的正确格式是：分子和分母都需要用花括号括起来；2. 对于较长的公式和不等式，请适当简化，避免单个公式过长。\\n\\n{chunk}'
+INCOMPLETE_SECTION_PROMPT = '这是论文的一部分，我需要保留其中完整的章节，所以请识别文本块中最后一个不完整的小节，并只返回该小节的节名（因为我后续要做文本的精确匹配，所以请严格保持小节名的名称格式!不允许修改大小写和增减空格!）。如果没有不完整的小节，请返回"无"。\\n\\n{chunk}'
+REPAIR_LATEX_PROMPT = '以下LaTeX片段无法编译，发现的问题：{issues}。请在不改变内容的前提下修复这些问题（补全或删除不配对的花括号、环境和公式定界符），只返回修复后的LaTeX片段，不要添加任何说明。\n\n{latex}'
+CHAPTER_SUMMARY_PROMPT = '以下是一篇长论文中某一章节各部分的中文解读（LaTeX格式）。请将其归纳为该章节的概要：说明本章要解决的问题、核心方法与关键结论，保留最重要的公式，去掉重复内容。输出为中文且使用latex语言的格式包装，以\\subsection*{{章节名}}开头，只返回LaTeX片段。\n\n{text}'
+DOCUMENT_SUMMARY_PROMPT = '以下是一篇长论文各章节的概要（LaTeX格式）。请写出全文概要：研究问题与动机、整体方法、各章节之间的关系以及主要结论。输出为中文且使用latex语言的格式包装，以\\section*{{全文概要}}开头，只返回LaTeX片段。\n\n{text}'
+
+# 比DEBUG更详细的级别，用于输出文本片段等大段内容，默认关闭
+TRACE = 5
+logging.addLevelName(TRACE, "TRACE")
+_LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+_log = logging.getLogger("texpap")
+_job_ids = itertools.count(1)
+_listener_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+_file_router = None
+_CLOSE_LOG_FILE = "__close_log_file__"
+# 当前线程（及通过 contextvars 复制上下文的工作线程）正在处理的任务日志记录器名称，
+# 共享的 texpap 记录器（AIHelper 等）输出的日志据此写入对应任务的日志文件
+_current_job: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("texpap_job", default=None)
+
+class _JobFileRouter(logging.Handler):
+    """在日志后台线程中按记录器名称把日志写入对应任务的日志文件"""
+
+    def __init__(self):
+        super().__init__()
+        self.files = {}
+
+    def register(self, name: str, handler: logging.FileHandler) -> None:
+        self.files[name] = handler
+
+    def emit(self, record: logging.LogRecord) -> None:
+        name = record.name if record.name in self.files else getattr(record, "job", None)
+        handler = self.files.get(name)
+        if handler is None:
+            return
+        if record.msg == _CLOSE_LOG_FILE:
+            # 关闭标记与日志记录经过同一队列，保证此前的记录都已写入
+            del self.files[name]
+            handler.close()
+            return
+        handler.handle(record)
+
+def _tag_job(record: logging.LogRecord) -> bool:
+    """在记录产生的线程中标注其所属任务（经队列交给后台线程后无法再取得）"""
+    record.job = _current_job.get()
+    return True
+
+def _ensure_listener() -> _JobFileRouter:
+    """首次使用时为 texpap 日志配置队列与后台写入线程（整个进程只配置一次）"""
+    global _listener, _file_router
+    with _listener_lock:
+        if _listener is None:
+            log_queue = queue.SimpleQueue()
+            console_handler = logging.StreamHandler()
+            console_handler.setLevel(_level(CONSOLE_LOG_LEVEL))
+            console_handler.setFormatter(logging.Formatter(_LOG_FORMAT))
+            console_handler.addFilter(lambda record: record.msg != _CLOSE_LOG_FILE)
+            _file_router = _JobFileRouter()
+            _listener = QueueListener(log_queue, console_handler, _file_router, respect_handler_level=True)
+            _listener.start()
+            atexit.register(_listener.stop)
+            queue_handler = QueueHandler(log_queue)
+            queue_handler.addFilter(_tag_job)
+            _log.addHandler(queue_handler)
+            _log.setLevel(min(_level(LOG_LEVEL), _level(CONSOLE_LOG_LEVEL)))
+            _log.propagate = False
+        return _file_router
+
+def _level(name: str) -> int:
+    level = logging.getLevelName(name.upper())
+    return level if isinstance(level, int) else logging.INFO
 
 class Logger:
     @staticmethod
     def setup(filename: str) -> logging.Logger:
-        """设置日志记录器"""
+        """为一次论文处理创建独立的日志记录器
+
+        每次调用都使用新的记录器名称，不会在同一记录器上重复添加处理器；
+        记录器不注册到 logging 的全局表中，处理结束后即可回收。
+        日志经队列交给后台线程写入文件与控制台，处理线程不会阻塞在磁盘IO上。
+        当前线程中共享的 texpap 记录器的输出也写入该任务的日志文件，
+        提交到线程池的任务需通过 contextvars.copy_context().run 执行（见 run_in_job_context）。
+        处理结束后需调用 Logger.close 释放日志文件。
+        """
+        router = _ensure_listener()
         timestamp = time.strftime("%Y%m%d_%H%M%S")
         log_file = LOGS_DIR / f"{filename}_{timestamp}_process.log"
-        
-        # 创建日志记录器
-        logger = logging.getLogger(filename)
-        logger.setLevel(logging.INFO)
-        
-        # 创建文件处理器
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setLevel(logging.INFO)
-        
-        # 创建控制台处理器
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        # 创建格式化器
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
-        
-        # 添加处理器
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
-        
+
+        logger = logging.Logger(f"texpap.job{next(_job_ids)}")
+        logger.parent = _log
+        file_handler = logging.FileHandler(log_file, encoding='utf-8', delay=True)
+        file_handler.setLevel(_level(LOG_LEVEL))
+        file_handler.setFormatter(logging.Formatter(_LOG_FORMAT))
+        router.register(logger.name, file_handler)
+        logger.log_file = str(log_file)
+        _current_job.set(logger.name)
         return logger
 
+    @staticmethod
+    def close(logger: logging.Logger) -> None:
+        """在已排队的日志写完后关闭该任务的日志文件"""
+        logger.log(logging.CRITICAL, _CLOSE_LOG_FILE)
+        if _current_job.get() == logger.name:
+            _current_job.set(None)
+
+def run_in_job_context(executor, fn, *args):
+    """向线程池提交任务，并让其中的日志归属当前任务"""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+def _is_transient(error: Exception) -> bool:
+    """限流、服务端错误与网络错误视为暂时性故障，计入熔断器"""
+    from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+    if isinstance(error, (APIConnectionError, APITimeoutError)):
+        return True
+    return isinstance(error, APIStatusError) and (error.status_code == 429 or error.status_code >= 500)
+
+def _wait_before_retry(retry_state) -> float:
+    """重试等待：带随机抖动的指数退避，服务端给出 Retry-After 时不短于该值"""
+    from tenacity import wait_random_exponential
+
+    backoff = wait_random_exponential(multiplier=2, min=4, max=30)(retry_state)
+    error = retry_state.outcome.exception() if retry_state.outcome else None
+    response = getattr(error, "response", None)
+    retry_after = retry_after_seconds(getattr(response, "headers", None))
+    return max(backoff, retry_after or 0)
+
+def _with_retry(func):
+    """失败时按 MAX_RETRY_ATTEMPTS 与 _wait_before_retry 重试（tenacity 在首次调用时才导入）"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        from tenacity import Retrying, stop_after_attempt
+
+        retrying = Retrying(stop=stop_after_attempt(MAX_RETRY_ATTEMPTS), wait=_wait_before_retry)
+        return retrying(func, *args, **kwargs)
+    return wrapper
+
 class AIHelper:
-    def __init__(self, client: OpenAI):
+    def __init__(self, client: "OpenAI", use_cache: bool = LLM_CACHE_ENABLED):
         self.client = client
+        self.cache = ResponseCache(
+            CACHE_DIR / "llm_responses.sqlite3",
+            max_entries=LLM_CACHE_MAX_ENTRIES,
+            max_age_days=LLM_CACHE_MAX_AGE_DAYS,
+            enabled=use_cache
+        )
+        # 跨论文的近似重复文本块索引，由调用方在解读前查询；绕过缓存时同样不复用已有解读
+        self.dedup = NearDuplicateIndex(
+            CACHE_DIR / "near_duplicates.sqlite3",
+            threshold=NEAR_DUPLICATE_THRESHOLD,
+            max_entries=NEAR_DUPLICATE_MAX_ENTRIES,
+            enabled=NEAR_DUPLICATE_ENABLED and use_cache
+        )
+        # 同一个AIHelper可被多篇论文共享，以下并发、限流与熔断状态对所有调用方生效
+        self.rate_limiter = RateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+        self.concurrency = AdaptiveConcurrency(MAX_CONCURRENT_REQUESTS)
+        self.circuit_breaker = CircuitBreaker(CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN)
+        # 网关拒绝流式请求参数后改为False，此后只发送非流式请求
+        self.stream_supported = True
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def process_chunk(self, chunk: str, index: int, total_chunks: int, timeout: int = 300) -> Optional[str]:
-        """处理单个文本块"""
+    def _complete(self, report: Optional[RunReport] = None, kind: str = "chat", index: Optional[int] = None,
+                  stream: bool = False, **kwargs) -> Optional[str]:
+        """在共享的并发、限流与熔断控制下发起一次模型请求，返回回复文本
+
+        stream为True时使用流式接口逐段接收回复，避免长回复在服务端整体生成完毕前
+        连接空等超时。report不为None时记录本次调用的耗时、状态与token用量。
+        遇到429时按 Retry-After 暂停所有请求并将并发上限减半；成功时逐步恢复并发。
+        """
+        prompt = "".join(message["content"] for message in kwargs.get("messages", []))
+        estimated_tokens = int(count_tokens(prompt) * (1 + EXPECTED_OUTPUT_RATIO))
+        start = time.time()
+        status = "ok"
+        usage = None
+        probe = False
         try:
-            print(f"开始处理第 {index + 1}/{total_chunks} 个文本块")
+            probe = self.circuit_breaker.before_call()
+            with self.concurrency:
+                self.rate_limiter.acquire(estimated_tokens)
+                start = time.time()
+                try:
+                    text, usage = self._request(stream, **kwargs)
+                except Exception as e:
+                    self._on_failure(e)
+                    raise
+            self.circuit_breaker.record_success()
+            self.concurrency.on_success()
+            if usage:
+                self.rate_limiter.adjust_tokens((usage.prompt_tokens or 0) + (usage.completion_tokens or 0) - estimated_tokens)
+            return text
+        except Exception:
+            status = "error"
+            if probe:
+                # 非暂时性错误不计入熔断器，但试探名额必须释放，否则熔断器会一直停在半开状态
+                self.circuit_breaker.release_probe()
+            raise
+        finally:
+            if report:
+                report.record_call(kind, time.time() - start, status, index, usage)
+
+    def _request(self, stream: bool, **kwargs):
+        """发送请求并返回(回复文本, token用量)，同时根据限流响应头调整限流器
+
+        流式请求被网关以400拒绝（不支持 stream_options 等参数）时改用非流式请求重发，
+        非流式请求成功后此后的请求都不再使用流式接口。
+        """
+        if not (stream and self.stream_supported):
+            return self._request_once(**kwargs)
+        from openai import BadRequestError
+
+        try:
+            return self._request_stream(**kwargs)
+        except BadRequestError as e:
+            result = self._request_once(**kwargs)
+            if self.stream_supported:
+                self.stream_supported = False
+                _log.warning(f"模型接口不支持流式请求参数，已改用非流式请求：{e}")
+            return result
+
+    def _request_once(self, **kwargs):
+        raw = self.client.chat.completions.with_raw_response.create(**kwargs)
+        self.rate_limiter.update_from_headers(raw.headers)
+        response = raw.parse()
+        return response.choices[0].message.content, getattr(response, "usage", None)
+
+    def _request_stream(self, **kwargs):
+        raw = self.client.chat.completions.with_raw_response.create(
+            stream=True, stream_options={"include_usage": True}, **kwargs
+        )
+        self.rate_limiter.update_from_headers(raw.headers)
+        parts = []
+        usage = None
+        for event in raw.parse():
+            if event.choices and event.choices[0].delta.content:
+                parts.append(event.choices[0].delta.content)
+            usage = getattr(event, "usage", None) or usage
+        return "".join(parts), usage
+
+    def _on_failure(self, error: Exception) -> None:
+        from openai import RateLimitError
+
+        if isinstance(error, RateLimitError):
+            response = getattr(error, "response", None)
+            retry_after = retry_after_seconds(getattr(response, "headers", None))
+            self.rate_limiter.pause(retry_after or 1.0)
+            self.concurrency.on_throttle()
+        if _is_transient(error):
+            self.circuit_breaker.record_failure()
+
+    @_with_retry
+    def process_chunk(self, chunk: str, index: int, total_chunks: int, timeout: int = 300,
+                      report: Optional[RunReport] = None) -> Optional[str]:
+        """处理单个文本块，report不为None时记录调用指标"""
+        try:
+            _log.debug(f"开始处理第 {index + 1}/{total_chunks} 个文本块")
             
-            prompt = '请对以下论文片段中每个完整的小节(如1.1视为一个章节）进行通俗易懂并条理清晰的解读(不对标题、作者、表格、参考文献进行解读)，解读要详略得当（不重要的部分简单概括即可，涉及公式和实现方法要详细解读）。只需要返回[小节（有数字编号优先使用原文的数字编号）]+[片段内容的解读（包含全部公式的详细解读）]。输出为中文且使用latex语言的格式包装，每一节内容解析为一个section，如\\section*，公式独立行展示，而一段话中的数学符号则用美元符号包裹，如"具有$O(N^2)$的时间"。注意！1. 分数命令的正确格式是：分子和分母都需要用花括号括起来；2. 对于较长的公式和不等式，请适当简化，避免单个公式过长。\\n\\n{chunk}'
+            cache_key = ResponseCache.make_key(DEFAULT_MODEL, PROCESS_CHUNK_PROMPT, 0, chunk)
+            cached = self.cache.get(cache_key)
+            if cached:
+                _log.debug(f"第 {index + 1}/{total_chunks} 个文本块命中缓存")
+                if report:
+                    report.record_call("process_chunk", 0.0, "cached", index)
+                return cached
 
-            response = self.client.chat.completions.create(
+            result = self._complete(
+                report=report,
+                kind="process_chunk",
+                index=index,
+                stream=STREAM_RESPONSES,
                 model=DEFAULT_MODEL,
-                messages=[{"role": "user", "content": prompt.format(chunk=chunk)}],
+                messages=[{"role": "user", "content": PROCESS_CHUNK_PROMPT.format(chunk=chunk)}],
                 temperature=0,
+                max_tokens=token_budget(DEFAULT_MODEL)["max_output_tokens"],
                 timeout=timeout
             )
             
-            result = response.choices[0].message.content
             if result and len(result) > 0:
-                print(f"成功处理第 {index + 1}/{total_chunks} 个文本块")
+                _log.debug(f"成功处理第 {index + 1}/{total_chunks} 个文本块")
+                self.cache.set(cache_key, result)
                 return result
             else:
                 raise Exception("处理结果为空或无效")
                 
         except Exception as e:
-            print(f"处理第 {index + 1}/{total_chunks} 个文本块失败：{str(e)}")
+            _log.warning(f"处理第 {index + 1}/{total_chunks} 个文本块失败：{str(e)}")
             raise
 
-    def find_last_incomplete_section(self, chunk: str) -> Optional[str]:
+    def repair_latex(self, latex: str, issues: List[str], index: int, report: Optional[RunReport] = None) -> Optional[str]:
+        """请求模型修复未通过校验的LaTeX片段，失败时返回None"""
+        prompt = REPAIR_LATEX_PROMPT.format(issues="；".join(issues), latex=latex)
+        cache_key = ResponseCache.make_key(DEFAULT_MODEL, REPAIR_LATEX_PROMPT, 0, prompt)
+        try:
+            result = self.cache.get(cache_key)
+            if result is None:
+                result = self._request_repair(prompt, report)
+                self.cache.set(cache_key, result)
+            return result
+        except Exception as e:
+            _log.warning(f"修复第 {index + 1} 个文本块的LaTeX失败：{str(e)}")
+            return None
+
+    @_with_retry
+    def _request_repair(self, prompt: str, report: Optional[RunReport] = None) -> str:
+        result = self._complete(
+            report=report,
+            kind="repair_latex",
+            model=DEFAULT_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+            max_tokens=token_budget(DEFAULT_MODEL)["max_output_tokens"]
+        )
+        if not result:
+            raise Exception("处理结果为空或无效")
+        return result
+
+    def summarize(self, prompt_template: str, text: str, kind: str = "summarize",
+                  report: Optional[RunReport] = None) -> Optional[str]:
+        """按给定提示词模板请求模型归纳文本（长文档的章节概要与全文概要），失败时返回None"""
+        cache_key = ResponseCache.make_key(DEFAULT_MODEL, prompt_template, 0, text)
+        try:
+            result = self.cache.get(cache_key)
+            if result is None:
+                result = self._request_summary(prompt_template.format(text=text), kind, report)
+                self.cache.set(cache_key, result)
+            elif report:
+                report.record_call(kind, 0.0, "cached")
+            return result
+        except Exception as e:
+            _log.warning(f"生成概要失败：{str(e)}")
+            return None
+
+    @_with_retry
+    def _request_summary(self, prompt: str, kind: str, report: Optional[RunReport] = None) -> str:
+        result = self._complete(
+            report=report,
+            kind=kind,
+            stream=STREAM_RESPONSES,
+            model=DEFAULT_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+            max_tokens=token_budget(DEFAULT_MODEL)["max_output_tokens"]
+        )
+        if not result:
+            raise Exception("处理结果为空或无效")
+        return result
+
+    def find_last_incomplete_section(self, chunk: str, report: Optional[RunReport] = None) -> Optional[str]:
         """识别文本块中最后一个不完整的小节"""
-        prompt = '这是论文的一部分，我需要保留其中完整的章节，所以请识别文本块中最后一个不完整的小节，并只返回该小节的节名（因为我后续要做文本的精确匹配，所以请严格保持小节名的名称格式!不允许修改大小写和增减空格!）。如果没有不完整的小节，请返回"无"。\\n\\n{chunk}'
-        
+        cache_key = ResponseCache.make_key(DEFAULT_MODEL, INCOMPLETE_SECTION_PROMPT, 0, chunk)
         try:
-            response = self.client.chat.completions.create(
-                model=DEFAULT_MODEL,
-                messages=[{"role": "user", "content": prompt.format(chunk=chunk)}],
-                temperature=0
-            )
-            result = response.choices[0].message.content.strip()
+            result = self.cache.get(cache_key)
+            if result is None:
+                result = self._request_incomplete_section(chunk, report)
+                self.cache.set(cache_key, result)
             return None if result == "无" else result
         except Exception as e:
-            print(f"查找不完整小节时出错：{str(e)}")
+            _log.warning(f"查找不完整小节时出错：{str(e)}")
             return None
 
+    @_with_retry
+    def _request_incomplete_section(self, chunk: str, report: Optional[RunReport] = None) -> str:
+        result = self._complete(
+            report=report,
+            kind="find_last_incomplete_section",
+            model=DEFAULT_MODEL,
+            messages=[{"role": "user", "content": INCOMPLETE_SECTION_PROMPT.format(chunk=chunk)}],
+            temperature=0
+        )
+        if not result:
+            raise Exception("处理结果为空或无效")
+        return result.strip()
+
 def find_section_using_regex(text: str, section_name: str) -> Tuple[int, Optional[str]]:
     """使用正则表达式查找章节位置"""
-    print(f"\n尝试匹配小节名：{section_name}")
-    print(f"文本块前200字符：{text[:200]}")
+    _log.debug(f"尝试匹配小节名：{section_name}")
+    if _log.isEnabledFor(TRACE):
+        _log.log(TRACE, f"文本块前200字符：{text[:200]}")
 
     escaped_name = re.escape(section_name)
     pattern = "(" + escaped_name + "|" + escaped_name.replace('\\s+', '\\s*') + ")"
@@ -94,20 +408,20 @@ def find_section_using_regex(text: str, section_name: str) -> Tuple[int, Optiona
 
     match = regex.search(text)
     if match:
-        print(f"找到匹配：{match.group()}，位置：{match.start()}")
+        _log.debug(f"找到匹配：{match.group()}，位置：{match.start()}")
         return match.start(), match.group()
     else:
-        print("未找到精确匹配，尝试模糊匹配")
+        _log.debug("未找到精确匹配，尝试模糊匹配")
         words = section_name.split()
         loose_pattern = '\\s*'.join(re.escape(word) for word in words)
         loose_regex = re.compile(loose_pattern, re.IGNORECASE)
         loose_match = loose_regex.search(text)
         
         if loose_match:
-            print(f"找到宽松匹配：{loose_match.group()}，位置：{loose_match.start()}")
+            _log.debug(f"找到宽松匹配：{loose_match.group()}，位置：{loose_match.start()}")
             return loose_match.start(), loose_match.group()
         
-        print("未找到任何匹配")
+        _log.debug("未找到任何匹配")
         return -1, None
 
 def get_file_prefix(filename: str) -> str:
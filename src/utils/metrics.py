@@ -0,0 +1,119 @@
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+class RunReport:
+    """单篇论文处理过程的结构化指标
+
+    事件（阶段耗时、模型调用、写入字节数等）在发生时逐行追加到 <前缀>_report.jsonl，
+    close() 时将汇总结果写入 <前缀>_report.json，前缀与处理日志一致。
+    同一实例可被多个线程同时使用。
+    """
+
+    def __init__(self, path_prefix: str, paper: str = ""):
+        self.events_path = f"{path_prefix}_report.jsonl"
+        self.summary_path = f"{path_prefix}_report.json"
+        self.paper = paper
+        self.started_at = time.time()
+        self.stages: Dict[str, float] = {}
+        self.calls = {"count": 0, "errors": 0, "cached": 0, "latencies": []}
+        self.chunk_attempts: Dict[int, int] = {}
+        self.tokens = {"prompt_tokens": 0, "completion_tokens": 0}
+        self.bytes_written: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._events = open(self.events_path, 'a', encoding='utf-8')
+
+    @classmethod
+    def for_logger(cls, logger: logging.Logger, paper: str = "") -> "RunReport":
+        """在处理日志旁创建报告（xxx_process.log -> xxx_report.jsonl/json）"""
+        log_file = getattr(logger, "log_file", None)
+        if log_file is None:
+            log_file = [h.baseFilename for h in logger.handlers if isinstance(h, logging.FileHandler)][-1]
+        return cls(log_file[:-len("_process.log")], paper)
+
+    def event(self, event: str, **fields) -> None:
+        """追加一条事件记录"""
+        record = {"ts": round(time.time(), 3), "event": event, **fields}
+        with self._lock:
+            if not self._events.closed:
+                self._events.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._events.flush()
+
+    @contextmanager
+    def stage(self, name: str):
+        """记录一个处理阶段的耗时"""
+        start = time.time()
+        status = "ok"
+        try:
+            yield
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            elapsed = time.time() - start
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            self.event("stage", name=name, seconds=round(elapsed, 3), status=status)
+
+    def record_call(self, kind: str, latency: float, status: str, index: Optional[int] = None, usage=None) -> None:
+        """记录一次模型调用（status为ok/error/cached），usage为接口返回的token用量"""
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        with self._lock:
+            self.calls["count"] += 1
+            if status == "error":
+                self.calls["errors"] += 1
+            elif status == "cached":
+                self.calls["cached"] += 1
+            else:
+                self.calls["latencies"].append(latency)
+            if index is not None and status != "cached":
+                self.chunk_attempts[index] = self.chunk_attempts.get(index, 0) + 1
+            self.tokens["prompt_tokens"] += prompt_tokens
+            self.tokens["completion_tokens"] += completion_tokens
+        self.event("llm_call", kind=kind, index=index, status=status, latency=round(latency, 3),
+                   prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def record_bytes(self, path: str, size: int) -> None:
+        """记录写入文件的字节数"""
+        with self._lock:
+            self.bytes_written[path] = self.bytes_written.get(path, 0) + size
+
+    def count(self, name: str, value: int = 1) -> None:
+        """累加一个计数器（如提取页数、文本块数）"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self.calls["latencies"])
+            return {
+                "paper": self.paper,
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+                "wall_seconds": round(time.time() - self.started_at, 3),
+                "stages": {name: round(seconds, 3) for name, seconds in self.stages.items()},
+                "llm_calls": {
+                    "count": self.calls["count"],
+                    "errors": self.calls["errors"],
+                    "cached": self.calls["cached"],
+                    "retries": sum(attempts - 1 for attempts in self.chunk_attempts.values()),
+                    "latency_p50": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                    "latency_max": round(latencies[-1], 3) if latencies else None,
+                },
+                "tokens": dict(self.tokens),
+                "bytes_written": dict(self.bytes_written),
+                "counters": dict(self.counters),
+            }
+
+    def close(self) -> Dict:
+        """写入汇总报告并关闭事件文件，返回汇总结果"""
+        summary = self.summary()
+        with open(self.summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        with self._lock:
+            self._events.close()
+        return summary
@@ -0,0 +1,215 @@
+import re
+import time
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+def parse_duration(value: str) -> Optional[float]:
+    """解析限流响应头中的时长，如 "1s"、"6m0s"、"20ms" 或纯数字秒数"""
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+def retry_after_seconds(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """从 retry-after-ms / retry-after 响应头中读取建议的等待时间（秒）"""
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    seconds = parse_duration(value)
+    if seconds is not None:
+        return seconds
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class _TokenBucket:
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.capacity = max(1, per_minute)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.per_minute / 60)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """距离桶中有足够令牌还需等待的时间；amount超过容量时按容量计算，避免永远等待"""
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) * 60 / self.per_minute
+
+class RateLimiter:
+    """线程安全的令牌桶限流器，同时限制每分钟请求数与每分钟token数
+
+    两个上限为0时表示不限。服务端返回 Retry-After 或限流响应头提示配额耗尽时，
+    通过 pause() 让所有调用方一起等待，而不是各自重试加剧拥塞。
+    多篇论文共享同一个实例即可共享配额。
+    """
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = _TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = _TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> None:
+        """阻塞直到获得一个请求配额及预计消耗的token配额"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    for bucket in (self._requests, self._tokens):
+                        if bucket:
+                            bucket.refill(now)
+                    wait = max(
+                        self._requests.wait_time(1) if self._requests else 0.0,
+                        self._tokens.wait_time(tokens) if self._tokens else 0.0,
+                    )
+                    if wait <= 0:
+                        if self._requests:
+                            self._requests.tokens -= 1
+                        if self._tokens:
+                            self._tokens.tokens -= min(tokens, self._tokens.capacity)
+                        return
+            time.sleep(wait)
+
+    def adjust_tokens(self, delta: int) -> None:
+        """按实际token用量修正预估值（delta为实际值减预估值）"""
+        if not self._tokens or not delta:
+            return
+        with self._lock:
+            self._tokens.tokens -= delta
+
+    def pause(self, seconds: float) -> None:
+        """在接下来的seconds秒内暂停放行所有请求"""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers: Optional[Mapping[str, str]]) -> None:
+        """根据 x-ratelimit-* 响应头，在服务端配额耗尽时暂停到配额重置"""
+        if not headers:
+            return
+        for kind in ("requests", "tokens"):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            try:
+                exhausted = float(remaining) <= 0
+            except ValueError:
+                continue
+            if exhausted:
+                self.pause(parse_duration(headers.get(f"x-ratelimit-reset-{kind}", "")) or 1.0)
+
+class AdaptiveConcurrency:
+    """按AIMD（加性增、乘性减）调整的并发上限
+
+    每次成功请求使上限增加 1/上限，遇到限流时上限减半，
+    使并发度逐步逼近服务端配额而不引发重试风暴。
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def __enter__(self) -> "AdaptiveConcurrency":
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, *exc) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self) -> None:
+        with self._condition:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def on_throttle(self) -> None:
+        with self._condition:
+            self.limit = max(self.min_limit, self.limit / 2)
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求被直接拒绝"""
+
+class CircuitBreaker:
+    """连续失败达到阈值后熔断一段时间，期间请求立即失败
+
+    冷却结束后进入半开状态，只放行一个试探请求：成功则恢复，失败则再次熔断。
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+    def before_call(self) -> bool:
+        """请求前检查，熔断中则抛出 CircuitOpenError；返回本次请求是否为半开状态下的试探请求"""
+        if self.failure_threshold <= 0:
+            return False
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            remaining = self.cooldown - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._probing:
+                raise CircuitOpenError(f"模型接口熔断中，{max(remaining, 0):.0f} 秒后重试")
+            self._probing = True
+            return True
+
+    def release_probe(self) -> None:
+        """试探请求以非暂时性错误结束（如400、解析失败）时释放试探名额，保持半开状态由下一个请求继续试探"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold > 0:
+                self._opened_at = time.monotonic()
+            self._probing = False
@@ -0,0 +1,45 @@
+import re
+import math
+from functools import lru_cache
+from typing import Dict
+from src.config.settings import DEFAULT_MODEL, MODEL_TOKEN_BUDGETS, DEFAULT_TOKEN_BUDGET, EXPECTED_OUTPUT_RATIO
+
+# 本地估算用：CJK字符、英文单词、其余符号（数学公式中的符号通常各占一个token）
+_ESTIMATE_PATTERN = re.compile(r'[㐀-鿿豈-﫿]|[A-Za-z0-9]+|[^\sA-Za-z0-9]')
+
+@lru_cache(maxsize=None)
+def _encoding_for(model: str):
+    """返回模型对应的tiktoken编码器；未安装tiktoken或无法加载编码表时返回None"""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """统计文本的token数，无可用分词器时按字符类别估算"""
+    encoding = _encoding_for(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    count = 0
+    for match in _ESTIMATE_PATTERN.finditer(text):
+        piece = match.group()
+        count += math.ceil(len(piece) / 4) if piece[0].isascii() and piece[0].isalnum() else 1
+    return count
+
+def token_budget(model: str = DEFAULT_MODEL) -> Dict[str, int]:
+    """返回模型的token预算：上下文窗口、最大输出长度与单个文本块的输入上限
+
+    输入上限同时受配置的 max_input_tokens 和最大输出长度约束，
+    为按 EXPECTED_OUTPUT_RATIO 估算的解读长度预留空间。
+    """
+    budget = dict(MODEL_TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET))
+    budget["chunk_tokens"] = min(
+        budget["max_input_tokens"],
+        int(budget["max_output_tokens"] / EXPECTED_OUTPUT_RATIO),
+        budget["context_window"] - budget["max_output_tokens"] - 1000,  # 1000为提示词预留
+    )
+    return budget
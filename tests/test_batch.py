@@ -0,0 +1,31 @@
+import threading
+from src.core.batch import BatchRunner
+
+class _FakeProcessor:
+    def __init__(self):
+        self.processed = []
+        self._lock = threading.Lock()
+
+    def process_pdf(self, pdf_path, stats, force=False):
+        assert force
+        with self._lock:
+            self.processed.append(pdf_path)
+        return pdf_path + ".tex", None, pdf_path + ".md"
+
+def test_same_name_papers_are_not_processed_together(tmp_path):
+    paths = []
+    for folder in ("a", "b"):
+        (tmp_path / folder).mkdir()
+        paths.append(tmp_path / folder / "paper.pdf")
+    paths.append(tmp_path / "a" / "a_very_long_name_1.pdf")
+    paths.append(tmp_path / "b" / "a_very_long_name_2.pdf")
+    for path in paths:
+        path.write_bytes(b"%PDF-1.4")
+
+    processor = _FakeProcessor()
+    results = BatchRunner(processor, max_concurrent_papers=4).run(paths, force=True)
+
+    assert sorted(processor.processed) == sorted([str(paths[0]), str(paths[2])])
+    assert results[0]["status"].startswith("成功") and results[2]["status"].startswith("成功")
+    assert str(paths[0]) in results[1]["status"]
+    assert str(paths[2]) in results[3]["status"]
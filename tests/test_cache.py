@@ -0,0 +1,18 @@
+import time
+from src.utils.cache import ResponseCache
+
+def test_set_evicts_oldest_entries(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite3", max_entries=2)
+    for i in range(3):
+        cache.set(f"key{i}", f"response{i}")
+        time.sleep(0.01)
+    assert cache.get("key0") is None
+    assert cache.get("key2") == "response2"
+    assert cache._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 2
+
+def test_set_evicts_expired_entries(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite3", max_age_days=1)
+    cache.set("old", "stale")
+    cache._conn.execute("UPDATE responses SET created_at = ?", (time.time() - 2 * 86400,))
+    cache.set("new", "fresh")
+    assert cache._conn.execute("SELECT key FROM responses").fetchall() == [("new",)]
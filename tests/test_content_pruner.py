@@ -0,0 +1,59 @@
+from src.handlers.content_pruner import ContentPruner
+
+BODY = "We train the model on long sequences and report perplexity on held out data."
+
+def make_pages(count, extra=None):
+    pages = []
+    for p in range(count):
+        lines = ["Preprint. Under review.", f"{p + 1} Section {p + 1}"] + [BODY] * 10 + [str(p + 1)]
+        pages.append(lines)
+    for page, index, line in extra or []:
+        pages[page].insert(index, line)
+    return ["\n".join(lines) for lines in pages]
+
+def prune(pages, **kwargs):
+    pruner = ContentPruner(total_pages=len(pages), **kwargs)
+    return list(pruner.iter_pages(pages)), pruner
+
+def test_wrapped_body_line_mentioning_appendix_is_kept():
+    pages = make_pages(10, [(3, 5, "Appendix B for the full derivation of the"), (3, 6, "loss, which we omit here.")])
+    kept, pruner = prune(pages)
+    assert pruner.removed["appendix"] == 0
+    assert all(f"{p + 1} Section {p + 1}" in kept[p] for p in range(10))
+
+def test_appendix_heading_early_in_document_is_ignored():
+    kept, pruner = prune(make_pages(10, [(1, 2, "Appendix A")]))
+    assert pruner.removed["appendix"] == 0
+    assert len(kept) == 10
+
+def test_appendix_in_latter_part_is_pruned():
+    kept, pruner = prune(make_pages(10, [(8, 2, "Appendix A: Proofs of Theorem 1")]))
+    assert pruner.removed["appendix"] > 0
+    assert "9 Section 9" in kept[8] and BODY not in kept[8]
+    # 数字编号的一级标题说明附录之后回到了正文
+    assert "10 Section 10" in kept[9]
+
+def test_appendix_kept_when_disabled():
+    kept, pruner = prune(make_pages(10, [(8, 2, "Appendix A")]), prune_appendix=False)
+    assert pruner.removed["appendix"] == 0
+    assert "Section 10" in kept[9]
+
+def test_references_word_in_prose_is_not_a_bibliography():
+    pages = make_pages(6, [(4, 3, "References"), (4, 4, "to prior work are listed below in the text.")])
+    kept, pruner = prune(pages)
+    assert pruner.removed["references"] == 0
+    assert len(kept) == 6
+
+def test_bibliography_stops_extraction():
+    pages = make_pages(6, [(4, 12, "References"), (4, 13, "[1] A. Author. A paper. 2019."),
+                           (4, 14, "[2] B. Author. Another paper. 2020.")])
+    kept, pruner = prune(pages)
+    assert pruner.finished and pruner.removed["references"] > 0
+    assert "[1] A. Author" not in "\n".join(kept)
+
+def test_repeated_headers_and_page_numbers_removed():
+    kept, pruner = prune(make_pages(6))
+    text = "\n".join(kept)
+    assert "Preprint. Under review." not in text
+    assert pruner.removed["header_footer"] > 0 and pruner.removed["page_number"] > 0
+    assert "1 Section 1" in text
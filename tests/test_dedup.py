@@ -0,0 +1,22 @@
+from src.utils.dedup import NearDuplicateIndex
+from src.utils.helpers import AIHelper
+
+BASE = " ".join(f"word{i % 97} token{i % 13} alpha{i}" for i in range(400))
+
+def test_near_duplicate_found_and_distinct_text_missed(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "index.sqlite3")
+    index.add(BASE, "paper 第 1 块", "result")
+    match = index.find(BASE.replace("alpha5 ", "beta5 ", 1))
+    assert match and match.result == "result" and match.similarity >= 0.9
+    assert index.find(" ".join(f"other{i} thing{i % 7}" for i in range(400))) is None
+    assert index.find("too short") is None
+
+def test_add_evicts_oldest_entries(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "index.sqlite3", max_entries=1)
+    index.add(BASE, "old", "old result")
+    index.add(" ".join(f"other{i} thing{i % 7}" for i in range(400)), "new", "new result")
+    assert index._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0] == 1
+    assert index.find(BASE) is None
+
+def test_cache_bypass_disables_dedup():
+    assert not AIHelper(client=None, use_cache=False).dedup.enabled
@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+from openai import BadRequestError
+from src.utils.helpers import AIHelper
+
+class _Gateway:
+    """不支持 stream_options 的兼容网关：流式请求返回400"""
+
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if "stream_options" in kwargs:
+            response = SimpleNamespace(request=None, status_code=400, headers={})
+            raise BadRequestError("Unrecognized request argument: stream_options", response=response, body=None)
+        message = SimpleNamespace(content="reply")
+        parsed = SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+        return SimpleNamespace(headers={}, parse=lambda: parsed)
+
+def test_stream_rejected_by_gateway_falls_back_to_plain_request():
+    gateway = _Gateway()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        with_raw_response=SimpleNamespace(create=gateway.create))))
+    helper = AIHelper(client, use_cache=False)
+    messages = [{"role": "user", "content": "hi"}]
+
+    assert helper._complete(model="m", messages=messages, stream=True) == "reply"
+    assert helper._complete(model="m", messages=messages, stream=True) == "reply"
+    assert [("stream_options" in call) for call in gateway.calls] == [True, False, False]
+    assert not helper.stream_supported
@@ -0,0 +1,35 @@
+from src.core.job import JobManifest
+
+def test_revisions_use_separate_dirs_and_share_results(tmp_path):
+    v1 = JobManifest(tmp_path / "2401.00001v1", "hash-v1")
+    v1.save_chunks(["intro text", "method text"], [["a"], ["b"]])
+    v1.save_chunk_result(0, "intro result")
+    v1.save_chunk_result(1, "method result")
+
+    v2 = JobManifest(tmp_path / "2401.00001v2", "hash-v2")
+    assert v2.previous_result("method  text") == "method result"
+    assert v2.previous_plan() == [["a"], ["b"]]
+
+    # 打开v2不会清除v1的检查点
+    reopened = JobManifest(tmp_path / "2401.00001v1", "hash-v1")
+    assert reopened.resumed and reopened.load_chunk_result(1) == "method result"
+
+def test_unrelated_papers_do_not_share_results(tmp_path):
+    other = JobManifest(tmp_path / "paper_a", "hash-a")
+    other.save_chunks(["shared text"])
+    other.save_chunk_result(0, "result a")
+    assert JobManifest(tmp_path / "paper_b", "hash-b").previous_result("shared text") is None
+
+def test_revision_key():
+    assert JobManifest.revision_key("2401.01234v3") == "2401.01234"
+    assert JobManifest.revision_key("transformer_v2") == "transformer_v2"
+
+def test_reset_clears_checkpoint_and_previous_results(tmp_path):
+    job = JobManifest(tmp_path / "paper", "hash")
+    job.save_chunks(["intro text"], [["a"]])
+    job.save_chunk_result(0, "intro result")
+
+    assert JobManifest(tmp_path / "paper", "hash").resumed
+    reset = JobManifest(tmp_path / "paper", "hash", reset=True)
+    assert not reset.resumed and not reset.has_chunk_result(0)
+    assert reset.previous_result("intro text") is None and reset.previous_plan() is None
@@ -0,0 +1,37 @@
+import subprocess
+import pytest
+from src.handlers.latex_handler import LatexHandler
+
+def run_failing(output, calls):
+    def run(tex_path, work_dir, fmt_name):
+        calls.append(fmt_name)
+        if fmt_name:
+            raise subprocess.CalledProcessError(1, "xelatex", output=output, stderr="")
+        return subprocess.CompletedProcess("xelatex", 0, stdout="", stderr="")
+    return run
+
+@pytest.fixture
+def compile_env(tmp_path, monkeypatch):
+    tex_path = tmp_path / "doc.tex"
+    tex_path.write_text("x")
+    discarded = []
+    monkeypatch.setattr("src.handlers.latex_handler.LOGS_DIR", tmp_path)
+    monkeypatch.setattr(LatexHandler, "_ensure_preamble_format", staticmethod(lambda *args: "texpap_fmt"))
+    monkeypatch.setattr(LatexHandler, "_discard_format", staticmethod(discarded.append))
+    return str(tex_path), discarded, monkeypatch
+
+def test_document_error_keeps_format_and_does_not_recompile(compile_env):
+    tex_path, discarded, monkeypatch = compile_env
+    calls = []
+    monkeypatch.setattr(LatexHandler, "_run_xelatex", staticmethod(run_failing("! Undefined control sequence.", calls)))
+    with pytest.raises(subprocess.CalledProcessError):
+        LatexHandler.compile_tex(tex_path, "doc.pdf")
+    assert discarded == [] and calls == ["texpap_fmt"]
+
+def test_format_error_falls_back_to_full_compile(compile_env):
+    tex_path, discarded, monkeypatch = compile_env
+    calls = []
+    monkeypatch.setattr(LatexHandler, "_run_xelatex",
+                        staticmethod(run_failing("I can't find the format file `texpap_fmt.fmt'!", calls)))
+    LatexHandler.compile_tex(tex_path, "doc.pdf")
+    assert discarded == ["texpap_fmt"] and calls[:2] == ["texpap_fmt", None]
@@ -0,0 +1,20 @@
+from src.handlers.latex_sanitizer import sanitize_latex
+
+def test_adjacent_inline_math_is_valid():
+    assert sanitize_latex("$a$$b$") == ("$a$$b$", [])
+    assert sanitize_latex("where $x$$y$ and $$z$$") == ("where $x$$y$ and $$z$$", [])
+
+def test_trailing_dollar_after_inline_math_is_dropped():
+    check = sanitize_latex("$a$$")
+    assert check.text == "$a$" and check.issues
+
+def test_escapes_specials_outside_math_only():
+    check = sanitize_latex("50% of x_1 and $x_1^2$, see \\label{eq_a}")
+    assert check.text == "50\\% of x\\_1 and $x_1^2$, see \\label{eq_a}"
+    assert check.issues == []
+
+def test_repairs_unbalanced_structures():
+    assert sanitize_latex("\\begin{align}a&b\\end{equation}").text == "\\begin{align}a&b\\end{align}"
+    assert sanitize_latex("}{a").text == "{a}"
+    check = sanitize_latex("\\(x\\]")
+    assert check.text == "\\(x\\)" and len(check.issues) == 2
@@ -0,0 +1,42 @@
+import time
+import logging
+import pytest
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.helpers import Logger, run_in_job_context, _log
+
+@pytest.fixture(autouse=True)
+def logs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.utils.helpers.LOGS_DIR", tmp_path)
+    return tmp_path
+
+def wait_for(path, text, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            content = open(path, encoding='utf-8').read()
+            if text in content:
+                return content
+        except OSError:
+            pass
+        time.sleep(0.05)
+    return open(path, encoding='utf-8').read()
+
+def test_shared_logger_records_reach_the_job_file(logs_dir):
+    logger = Logger.setup("test_shared_logger.pdf")
+    assert Path(logger.log_file).parent == logs_dir
+    logger.info("job message")
+    _log.warning("shared message from processing thread")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        run_in_job_context(executor, _log.warning, "shared message from worker").result()
+    Logger.close(logger)
+    content = wait_for(logger.log_file, "shared message from worker")
+    assert "job message" in content
+    assert "shared message from processing thread" in content
+    assert "shared message from worker" in content
+
+def test_job_loggers_are_not_registered_globally():
+    logger = Logger.setup("test_registry.pdf")
+    Logger.close(logger)
+    assert logger.name not in logging.Logger.manager.loggerDict
+    assert logger.getEffectiveLevel() == _log.getEffectiveLevel()
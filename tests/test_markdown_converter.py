@@ -0,0 +1,11 @@
+from src.handlers.markdown_converter import latex_to_markdown
+
+def test_sections_and_nested_inline_commands():
+    assert latex_to_markdown("\\section{Intro}\nSee \\textbf{bold \\emph{x}}.") == "# Intro\nSee **bold *x***."
+
+def test_math_delimiters():
+    assert latex_to_markdown("$a$$b$ and \\[x\\] \\(y\\)") == "$a$$b$ and $$x$$ $y$"
+    assert latex_to_markdown("\\begin{align}a&=b\\end{align}") == "$$\\begin{aligned}a&=b\\end{aligned}$$"
+
+def test_raw_arguments_are_kept():
+    assert latex_to_markdown("\\texttt{a_{b}}") == "`a_{b}`"
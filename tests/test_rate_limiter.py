@@ -0,0 +1,36 @@
+import pytest
+from types import SimpleNamespace
+from src.utils.rate_limiter import CircuitBreaker, CircuitOpenError
+from src.utils.helpers import AIHelper
+
+def open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0)
+    breaker.record_failure()
+    return breaker
+
+def test_half_open_allows_single_probe():
+    breaker = open_breaker()
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+def test_released_probe_lets_next_call_probe():
+    breaker = open_breaker()
+    breaker.before_call()
+    breaker.release_probe()
+    assert breaker.before_call() is True
+
+def test_probe_failing_with_non_transient_error_does_not_wedge_breaker():
+    class BadRequest(Exception):
+        pass
+
+    def create(**kwargs):
+        raise BadRequest("context length exceeded")
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        with_raw_response=SimpleNamespace(create=create))))
+    helper = AIHelper(client, use_cache=False)
+    helper.circuit_breaker = open_breaker()
+    with pytest.raises(BadRequest):
+        helper._complete(model="m", messages=[{"role": "user", "content": "hi"}])
+    assert helper.circuit_breaker.before_call() is True
@@ -0,0 +1,35 @@
+import time
+from pathlib import Path
+from src.core import job as job_module
+from src.core import service as service_module
+from src.core.job import JobManifest
+from src.core.service import PaperService
+from src.utils.helpers import get_file_prefix
+
+class _FakeProcessor:
+    def process_pdf(self, pdf_path, stats, force=False):
+        job = JobManifest.for_pdf(pdf_path)
+        job.mark_done("tex", pdf_path)
+        prefix = get_file_prefix(Path(pdf_path).name)
+        return f"{prefix}_解析结果.tex", None, f"{prefix}_解析结果.md"
+
+def test_same_name_uploads_do_not_share_job_dir_or_outputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(service_module, "UPLOADS_DIR", tmp_path / "uploads")
+    monkeypatch.setattr(job_module, "JOBS_DIR", tmp_path / "jobs")
+    service = PaperService(_FakeProcessor(), workers=2)
+    first = service.submit("paper.pdf", b"%PDF-1.4 first")
+    second = service.submit("paper.pdf", b"%PDF-1.4 second")
+    assert first["paper"] == second["paper"] == "paper.pdf"
+
+    service.start()
+    deadline = time.time() + 5
+    while time.time() < deadline and any(service.jobs[job_id]["status"] in ("queued", "running")
+                                         for job_id in (first["id"], second["id"])):
+        time.sleep(0.01)
+    service.stop()
+    jobs = [service.jobs[first["id"]], service.jobs[second["id"]]]
+    assert [job["status"] for job in jobs] == ["done", "done"]
+    assert JobManifest.job_name(jobs[0]["pdf_path"]) != JobManifest.job_name(jobs[1]["pdf_path"])
+    assert jobs[0]["outputs"] != jobs[1]["outputs"]
+    for job in jobs:
+        assert JobManifest.for_pdf(job["pdf_path"]).get("tex") == job["pdf_path"]
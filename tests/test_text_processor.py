@@ -0,0 +1,28 @@
+from src.handlers.text_processor import TextProcessor
+from src.utils.cache import content_hash
+
+def test_plan_chunk_groups_packs_sections_within_budget():
+    sections = ["a " * 50, "b " * 50, "c " * 2000]
+    groups = TextProcessor.plan_chunk_groups(sections, 200, 20)
+    assert groups[0] == sections[:2]
+    assert "".join(piece for group in groups[1:] for piece in group) == sections[2]
+    assert TextProcessor.plan_chunks(sections, 200, 20) == ["\n".join(group) for group in groups]
+
+def test_iter_sections_splits_on_headings_across_pages():
+    pages = ["Abstract\nfoo\n1\n1 Introduction\nbar", "\f2 Method\nbaz. The end."]
+    sections = list(TextProcessor.iter_sections(pages))
+    assert [section.split("\n")[0] for section in sections] == ["Abstract", "1 Introduction", "2 Method"]
+    assert "\n1\n" not in sections[0]
+
+def test_body_sentences_are_not_headings():
+    assert TextProcessor.is_section_heading("3.2 Relative Positional Encodings")
+    assert not TextProcessor.is_section_heading("2 The model is trained on a large corpus of text and then evaluated.")
+
+def test_plan_chunk_groups_keeps_unchanged_groups_of_previous_revision():
+    sections = ["a " * 50, "b " * 50, "c " * 2000]
+    groups = TextProcessor.plan_chunk_groups(sections, 200, 20)
+    previous = [[content_hash(piece) for piece in group] for group in groups]
+    assert TextProcessor.plan_chunk_groups(sections, 200, 20, previous=previous) == groups
+
+    revised = TextProcessor.plan_chunk_groups(["a " * 50, "new " * 30] + sections[1:], 200, 20, previous=previous)
+    assert revised[-len(groups) + 1:] == groups[1:]